@@ -0,0 +1,193 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from analysis import eslint_runner
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# In-memory tier budget (bytes of serialized results); the disk tier is off
+# unless ANALYSIS_CACHE_PATH points at a SQLite file.
+DEFAULT_MEMORY_BYTES = int(os.environ.get("ANALYSIS_CACHE_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_DISK_PATH = os.environ.get("ANALYSIS_CACHE_PATH") or None
+
+# External tools whose output ends up in each language's results
+TOOLCHAINS = {
+    "python": [["pylint", "--version"]],
+    "javascript": [[eslint_runner.eslint_command() or "eslint", "--version"], ["node", "--version"]],
+    "c": [["gcc", "--version"], ["cppcheck", "--version"]],
+    "cpp": [["g++", "--version"], ["cppcheck", "--version"]],
+    "c++": [["g++", "--version"], ["cppcheck", "--version"]],
+    "java": [["javac", "-version"]],
+}
+
+
+def _analyzer_version():
+    """Digest of the analyzer sources and configs, so editing any of them invalidates old entries."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(ANALYSIS_DIR, "*.py")) + glob.glob(os.path.join(ANALYSIS_DIR, "*.cjs"))):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+ANALYZER_VERSION = _analyzer_version()
+
+
+@lru_cache(maxsize=None)
+def toolchain_version(language: str) -> str:
+    """Version strings of the language's external tools (looked up once per process)."""
+    versions = []
+    for cmd in TOOLCHAINS.get(language, []):
+        name = os.path.basename(cmd[0])
+        if not shutil.which(cmd[0]):
+            versions.append(f"{name}:missing")
+            continue
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            output = (proc.stdout or proc.stderr).strip()
+            versions.append(f"{name}:{output.splitlines()[0] if output else ''}")
+        except (OSError, subprocess.SubprocessError):
+            versions.append(f"{name}:unknown")
+    return ";".join(versions)
+
+
+def cache_key(kind: str, code: str, language: str, context: str = "") -> str:
+    """
+    sha256 of the code plus what produced the result: kind, language, analyzer
+    and toolchain versions, and context for results that also depend on other
+    files (e.g. a Java file's compile unit, see error_checker.java_unit_contexts).
+    """
+    code_hash = hashlib.sha256(code.encode("utf-8", errors="ignore")).hexdigest()
+    version = f"{ANALYZER_VERSION}|{toolchain_version(language)}"
+    if context:
+        code_hash = f"{code_hash}\0{context}"
+    return hashlib.sha256(f"{kind}\0{language}\0{version}\0{code_hash}".encode()).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Two-tier, content-addressed cache of analysis results.
+    Results are stored as JSON text: the LRU tier is bounded by total text size,
+    and every hit returns a fresh copy, so callers may mutate what they get.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BYTES, disk_path: str = DEFAULT_DISK_PATH):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _remember(self, key, text):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            if len(text) > self.max_bytes:
+                return
+            self._entries[key] = text
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters["evictions"] += 1
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is not None:
+                self._entries.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return json.loads(text)
+
+        if self.disk_path:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._remember(key, row[0])
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                return json.loads(row[0])
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def __contains__(self, key):
+        """Presence check that leaves the hit / miss counters alone."""
+        with self._lock:
+            if key in self._entries:
+                return True
+        if self.disk_path:
+            with self._connect() as conn:
+                return conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone() is not None
+        return False
+
+    def put(self, key, value):
+        """Store a result; one flagged with tool_errors (a failed or timed-out tool) is not kept."""
+        if isinstance(value, dict) and value.get("tool_errors"):
+            return
+        text = json.dumps(value)
+        self._remember(key, text)
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, text))
+
+    def cached(self, kind, code, language, compute, context=""):
+        """Return the cached result for (kind, code, language, context), computing and storing it on a miss."""
+        key = cache_key(kind, code, language, context)
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+            result = json.loads(json.dumps(result))  # hand back a copy, like a hit would
+        return result
+
+    def stats(self):
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                **self._counters,
+                "hits": hits,
+                "hit_rate": round(hits / lookups * 100, 2) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk": bool(self.disk_path),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM results")
+
+
+# Shared by the /analyze route and the batch processor
+analysis_cache = AnalysisCache()
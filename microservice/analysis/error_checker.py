@@ -1,41 +1,50 @@
 import ast
+import hashlib
+import posixpath
 import subprocess
 import tempfile
 import os
 import shutil
 import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+from analysis import eslint_runner, pylint_runner, tool_runner
+
+# C/C++ batch checks: one cppcheck run and a few compiler runs per batch
+C_CPP_JOBS = int(os.environ.get("C_CPP_JOBS", str(os.cpu_count() or 1)))
+C_CPP_TIMEOUT = float(os.environ.get("C_CPP_TIMEOUT", "10"))  # per file
 
 # ----------------------------
 # ✅ Python Error Checker
 # ----------------------------
-def check_python_errors(code: str):
-    syntax_errors, logic_issues = [], []
-
-    # Syntax check with AST
-    try:
-        ast.parse(code)
-    except SyntaxError as e:
-        syntax_errors.append(str(e))
+def check_python_errors(code: str, pylint_messages=None):
+    """
+    pylint_messages: results of a batched pylint run, if the caller already has them.
+    Raises tool_runner.ToolError when pylint fails.
+    """
+    syntax_errors, logic_issues = python_syntax_errors(code), []
 
-    # Run pylint for logic/style
-    with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as tmp:
-        tmp.write(code.encode())
-        tmp.flush()
+    # Run pylint for logic/style (warm worker pool, see analysis.pylint_runner)
+    if pylint_messages is None:
         try:
-            proc = subprocess.run(
-                ["pylint", "--disable=all", "--enable=E,F,W,R,C", tmp.name],
-                capture_output=True, text=True, timeout=10
-            )
-            if proc.stdout.strip():
-                logic_issues.extend(clean_pylint_output(proc.stdout))
+            pylint_messages = pylint_runner.lint(code)
         except Exception as e:
-            logic_issues.append(f"Pylint error: {str(e)}")
-        finally:
-            os.unlink(tmp.name)
+            raise tool_runner.ToolError(f"Pylint error: {str(e)}") from e
+    logic_issues.extend(pylint_messages)
 
     return syntax_errors, logic_issues
 
 
+def python_syntax_errors(code: str) -> List[str]:
+    # Syntax check with AST
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return [str(e)]
+    return []
+
+
 def clean_pylint_output(output: str):
     errors = []
     for line in output.splitlines():
@@ -51,120 +60,361 @@ def clean_pylint_output(output: str):
 # ----------------------------
 
 def check_javascript_errors(code: str):
-    syntax_errors, logic_issues = [], []
+    # ESLint through the warm daemon (see analysis.eslint_runner); failures raise ESLintError
+    if eslint_runner.eslint_command():
+        try:
+            return eslint_runner.lint(code)
+        except subprocess.TimeoutExpired as e:
+            raise eslint_runner.ESLintError(str(e)) from e
+    return _node_syntax_check(code)
+
+
+def check_javascript_batch(files: Dict[str, str]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """(syntax_errors, logic_issues) per name, from one ESLint run over all files."""
+    if eslint_runner.eslint_command():
+        return eslint_runner.lint_files(files)
+    return {name: _node_syntax_check(code) for name, code in files.items()}
+
+
+def _node_syntax_check(code: str):
+    # Fallback when ESLint is not installed
+    syntax_errors = []
     with tempfile.NamedTemporaryFile(suffix=".js", delete=False) as tmp:
         tmp.write(code.encode())
-        tmp.flush()
-
-        eslint_config = "/home/krishna/Desktop/ai-code-review-assistant/microservice/analysis/eslint.config.cjs"
-
-        if shutil.which("eslint"):  # Use eslint if available
-            proc = subprocess.run(
-                ["eslint", "--config", eslint_config, "--no-warn-ignored", tmp.name],
-                capture_output=True, text=True, timeout=10,
-                cwd="/home/krishna/Desktop/ai-code-review-assistant/microservice/analysis"  # force working dir
-            )
-            if proc.stdout.strip():
-                logic_issues.extend(proc.stdout.strip().split("\n"))
-            if proc.stderr.strip():
-                syntax_errors.append(proc.stderr.strip())
-        else:  # fallback to Node syntax check
-            proc = subprocess.run(
-                ["node", "--check", tmp.name],
-                capture_output=True, text=True, timeout=5
-            )
-            if proc.returncode != 0:
-                syntax_errors.append(proc.stderr.strip())
-
-    os.unlink(tmp.name)
-    return syntax_errors, logic_issues
+    try:
+        proc = tool_runner.run(["node", "--check", tmp.name], timeout=5)
+        if proc.returncode != 0:
+            syntax_errors.append(proc.stderr.strip())
+    finally:
+        os.unlink(tmp.name)
+    return syntax_errors, []
 
 # ----------------------------
 # ✅ C / C++ Error Checker
 # ----------------------------
+COMPILERS = {"c": "gcc", "cpp": "g++"}
+SUFFIXES = {"c": ".c", "cpp": ".cpp"}
+LANGUAGE_ALIASES = {"c++": "cpp", "cxx": "cpp", "cc": "cpp"}
+# Everything --enable=all turns on except the whole-program checks: files in a
+# batch are unrelated, so unusedFunction and the cross-translation-unit (ctu*)
+# findings would depend on which files happen to share a run, while results
+# are cached per file
+CPPCHECK_ARGS = [
+    "--enable=warning,style,performance,portability,information",
+    "--suppress=missingIncludeSystem",
+    *(f"--suppress={check}" for check in (
+        "ctunullpointer", "ctuuninitvar", "ctuArrayIndex", "ctuPointerArith", "ctuOneDefinitionRuleViolation",
+    )),
+    "--quiet", "--xml", "--xml-version=2",
+]
+
+# "file_3.c:12:5: error: expected ';' before '}' token"
+_COMPILER_DIAGNOSTIC = re.compile(r"^(.+?):(\d+):(?:\d+:)? (?:fatal )?error: (.*)$")
+
+
 def check_c_cpp_errors(code: str, language: str):
-    syntax_errors, logic_issues = [], []
-    suffix = ".c" if language == "c" else ".cpp"
+    return check_c_cpp_batch({"snippet": (code, language)})["snippet"]
 
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp.write(code.encode())
-        tmp.flush()
 
-        # Syntax check with gcc/g++
-        cmd = ["gcc", "-fsyntax-only", tmp.name] if language == "c" else ["g++", "-fsyntax-only", tmp.name]
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-        if proc.returncode != 0 and proc.stderr.strip():
-            syntax_errors.append(proc.stderr.strip())
+def check_c_cpp_batch(files: Dict[str, Tuple[str, str]], jobs: int = C_CPP_JOBS) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    (syntax_errors, logic_issues) per name for {name: (code, language)}, where
+    language is "c", "cpp" or an alias such as "c++".
+    All files go to a single `cppcheck -j` run (XML output, whole-program
+    checks off, see CPPCHECK_ARGS), and to one compiler run per shard and
+    language, with the shards run in parallel. Diagnostics are mapped back to
+    their file, so each file's result is the same in any batch.
+    """
+    results = {name: ([], []) for name in files}
+    jobs = max(1, jobs)
+
+    with tempfile.TemporaryDirectory(prefix="cppcheck_") as tmpdir:
+        names, by_language = {}, {}
+        for i, (name, (code, language)) in enumerate(files.items()):
+            language = LANGUAGE_ALIASES.get(language.lower(), language.lower())
+            if language not in COMPILERS:
+                raise ValueError(f"Unsupported C/C++ language: {language}")
+            filename = f"file_{i}{SUFFIXES[language]}"
+            with open(os.path.join(tmpdir, filename), "w", encoding="utf-8") as f:
+                f.write(code)
+            names[filename] = name
+            by_language.setdefault(language, []).append(filename)
 
-        # Run cppcheck if available
-        if shutil.which("cppcheck"):
-            proc2 = subprocess.run(
-                ["cppcheck", "--enable=all", tmp.name],
-                capture_output=True, text=True, timeout=10
-            )
-            if proc2.stderr.strip():
-                logic_issues.extend(proc2.stderr.strip().split("\n"))
+        shards = [
+            (COMPILERS[language], group[i::jobs])
+            for language, group in by_language.items()
+            for i in range(min(jobs, len(group)))
+        ]
+        # Compiler shards and cppcheck all run at once (within the tool slots)
+        use_cppcheck = shutil.which("cppcheck") is not None
+        calls = [_run_compiler(compiler, shard, tmpdir) for compiler, shard in shards]
+        if use_cppcheck:
+            calls.append(_run_cppcheck(list(names), tmpdir, jobs))
+        outcomes = tool_runner.run_all(calls)
+
+        for outcome in outcomes[:len(shards)]:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            for filename, message in outcome:
+                if filename in names:
+                    results[names[filename]][0].append(message)
+
+        if not use_cppcheck:
+            for name in files:
+                results[name][1].append("ℹ️ Skipped cppcheck (not installed).")
+        elif isinstance(outcomes[-1], ET.ParseError):
+            raise tool_runner.ToolError(f"Cppcheck error: {str(outcomes[-1])}")
+        elif isinstance(outcomes[-1], BaseException):
+            raise outcomes[-1]
         else:
-            logic_issues.append("ℹ️ Skipped cppcheck (not installed).")
+            for filename, message in outcomes[-1]:
+                if filename in names:
+                    results[names[filename]][1].append(message)
+
+    return results
 
-    os.unlink(tmp.name)
-    return syntax_errors, logic_issues
+
+async def _run_compiler(compiler: str, filenames: List[str], cwd: str):
+    """(filename, "Line N: message") for every error of a -fsyntax-only run over filenames."""
+    proc = await tool_runner.run_async(
+        [compiler, "-fsyntax-only", "-fno-diagnostics-show-caret", *filenames],
+        timeout=C_CPP_TIMEOUT * len(filenames), cwd=cwd
+    )
+    diagnostics = []
+    for line in proc.stderr.splitlines():
+        match = _COMPILER_DIAGNOSTIC.match(line)
+        if match:
+            filename, lineno, message = match.groups()
+            diagnostics.append((filename, f"Line {lineno}: {message}"))
+    return diagnostics
+
+
+async def _run_cppcheck(filenames: List[str], cwd: str, jobs: int):
+    """(filename, "Line N: message (id)") for every located cppcheck finding."""
+    proc = await tool_runner.run_async(
+        ["cppcheck", *CPPCHECK_ARGS, f"-j{jobs}", *filenames],
+        timeout=C_CPP_TIMEOUT * len(filenames) / jobs + 10, cwd=cwd
+    )
+    diagnostics = []
+    for error in ET.fromstring(proc.stderr).iter("error"):
+        # The first location is where cppcheck reports the finding
+        location = error.find("location")
+        if location is not None:
+            message = f"Line {location.get('line')}: {error.get('msg')} ({error.get('id')})"
+            diagnostics.append((location.get("file"), message))
+    return diagnostics
 
 
 # ----------------------------
 # ✅ Java Error Checker
 # ----------------------------
-import os
-import re
-import subprocess
-import tempfile
+SPOTBUGS_HOME = os.environ.get(
+    "SPOTBUGS_HOME", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spotbugs-4.8.6")
+)
+JAVA_TIMEOUT = float(os.environ.get("JAVA_TIMEOUT", "10"))  # per file
+
+_JAVA_PUBLIC_TYPE = re.compile(r"public\s+(?:(?:abstract|final|sealed|strictfp)\s+)*(?:class|interface|enum|record)\s+(\w+)")
+_JAVA_PACKAGE = re.compile(r"^\s*package\s+(\w+(?:\.\w+)*)\s*;", re.MULTILINE)
+# "src/3/Main.java:12: error: ';' expected"
+_JAVAC_DIAGNOSTIC = re.compile(r"^(.+\.java):(\d+): (error|warning): (.+)$")
+
+
+def _java_source(relpath: str, code: str) -> Tuple[str, str, str]:
+    """(source root, path in it, code hash) of one file, before name clashes."""
+    directory, basename = posixpath.split(relpath)
+    public = _JAVA_PUBLIC_TYPE.search(code)
+    package = _JAVA_PACKAGE.search(code)
+    package_dir = package.group(1).replace(".", "/") if package else ""
+    root = directory
+    if package_dir and (directory == package_dir or directory.endswith("/" + package_dir)):
+        root = directory[:len(directory) - len(package_dir)].rstrip("/")
+    path = posixpath.join(package_dir, f"{public.group(1)}.java" if public else basename)
+    return root, path, hashlib.sha256(code.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def java_compile_units(sources: Dict[str, str], parsed: Optional[Dict] = None) -> Dict[str, Tuple[str, str]]:
+    """
+    (unit, path in unit) per relpath of {relpath: code}. A unit is a source
+    root: the file's directory minus its package path (com/acme/Main.java in
+    proj/src/com/acme belongs to proj/src), or the directory itself when the
+    package does not match it. The path in the unit is the package path plus
+    the public type's file name, so javac accepts the file. A file whose path
+    is already taken in its root, e.g. a second default-package `public class
+    Main`, is a unit of its own. parsed memoizes per-file parsing across calls
+    over a growing set of sources.
+    """
+    parsed = {} if parsed is None else parsed
+    units, taken = {}, set()
+    for relpath in sorted(sources):
+        if relpath not in parsed:
+            parsed[relpath] = _java_source(relpath, sources[relpath])
+        unit, path, _ = parsed[relpath]
+        if (unit, path) in taken:
+            unit = relpath
+        taken.add((unit, path))
+        units[relpath] = (unit, path)
+    return units
+
+
+def java_unit_contexts(sources: Dict[str, str], parsed: Optional[Dict] = None) -> Dict[str, str]:
+    """
+    Digest of each file's compile unit per relpath of {relpath: code}, over the
+    unit's paths and contents: a file's javac result depends on exactly these.
+    "" for a file alone in its unit, whose result is that of check_java_errors.
+    """
+    parsed = {} if parsed is None else parsed
+    members = {}
+    for relpath, (unit, path) in java_compile_units(sources, parsed).items():
+        members.setdefault(unit, []).append((relpath, f"{path}\0{parsed[relpath][2]}\0"))
+    contexts = {}
+    for group in members.values():
+        digest = hashlib.sha256("".join(sorted(item for _, item in group)).encode()).hexdigest()
+        for relpath, _ in group:
+            contexts[relpath] = digest if len(group) > 1 else ""
+    return contexts
+
 
 def check_java_errors(code: str):
-    syntax_errors, logic_issues = [], []
-
-    # Extract public class name for filename
-    match = re.search(r"public\s+class\s+(\w+)", code)
-    class_name = match.group(1) if match else "TempClass"
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        file_path = os.path.join(tmpdir, f"{class_name}.java")
-        with open(file_path, "w") as f:
-            f.write(code)
-
-        # --- Syntax check (javac) ---
-        proc = subprocess.run(
-            ["javac", "-Xlint:all", file_path],
-            capture_output=True, text=True, timeout=10
-        )
-        if proc.returncode != 0 and proc.stderr.strip():
-            for line in proc.stderr.splitlines():
-                match = re.search(r"(.+):(\d+): (error|warning): (.+)", line)
-                if match:
-                    _, lineno, _, message = match.groups()
-                    syntax_errors.append(f"Line {lineno}: {message}")
-                else:
-                    syntax_errors.append(line.strip())
-
-        # --- Logic check (SpotBugs) ---
-        spotbugs_home = os.path.expanduser("~/Desktop/ai-code-review-assistant/microservice/analysis/spotbugs-4.8.6")
-        spotbugs_bin = os.path.join(spotbugs_home, "bin", "spotbugs")
-
-        class_file = os.path.join(tmpdir, f"{class_name}.class")
-
-        if os.path.exists(spotbugs_bin) and os.path.exists(class_file):
-            try:
-                proc2 = subprocess.run(
-                    [spotbugs_bin, "-textui", class_file],
-                    capture_output=True, text=True, timeout=15
-                )
-                for line in proc2.stdout.splitlines():
-                    if line.strip():
-                        logic_issues.append(line.strip())
-                if proc2.stderr.strip():
-                    logic_issues.append(proc2.stderr.strip())
-            except Exception as e:
-                logic_issues.append(f"SpotBugs error: {str(e)}")
-        else:
-            logic_issues.append("ℹ️ Skipped SpotBugs (not found).")
+    result = check_java_batch({"snippet": ("Snippet.java", code)})["snippet"]
+    if isinstance(result, tool_runner.ToolError):
+        raise result
+    return result
 
-    return syntax_errors, logic_issues
+
+def check_java_batch(files: Dict[str, Tuple[str, str]],
+                     siblings: Optional[Dict[str, str]] = None) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    (syntax_errors, logic_issues) per name for {name: (relpath, code)}.
+    siblings ({relpath: code}) are other files of the same project, e.g. ones
+    already cached: they are not checked but javac resolves against them.
+    Files are grouped into compile units (see java_compile_units); each unit
+    is written out under its own root and compiled by one javac run with
+    -sourcepath on that root, so unrelated files may share a class name and
+    a file sees exactly its unit's other files, whatever the batch. The class
+    files go to as few SpotBugs runs as keep source paths unique per run.
+    A file whose SpotBugs run failed gets a ToolError instead, carrying its
+    javac results.
+    """
+    results = {name: ([], []) for name in files}
+    sources = dict(siblings or {})
+    sources.update(files.values())
+    units = java_compile_units(sources)
+    by_relpath = {relpath: name for name, (relpath, _) in files.items()}
+
+    with tempfile.TemporaryDirectory(prefix="javac_") as tmpdir:
+        roots = sorted({units[relpath][0] for relpath in by_relpath})
+        index = {unit: k for k, unit in enumerate(roots)}
+        # {unit index: {path as javac prints it: name}} for the checked files
+        checked = {k: {} for k in range(len(roots))}
+        for relpath, (unit, path) in units.items():
+            if unit not in index:
+                continue
+            written = f"src/{index[unit]}/{path}"
+            os.makedirs(os.path.dirname(os.path.join(tmpdir, written)), exist_ok=True)
+            with open(os.path.join(tmpdir, written), "w", encoding="utf-8") as f:
+                f.write(sources[relpath])
+            if relpath in by_relpath:
+                checked[index[unit]][written] = by_relpath[relpath]
+
+        # --- Syntax check (one javac run per unit, run side by side) ---
+        failed = set()
+        for outcome in tool_runner.run_all([_compile_java_unit(k, paths, results, tmpdir) for k, paths in checked.items()]):
+            if isinstance(outcome, BaseException):
+                raise outcome
+            failed |= outcome
+
+        # --- Logic check (SpotBugs over the class files) ---
+        spotbugs_bin = os.path.join(SPOTBUGS_HOME, "bin", "spotbugs")
+        compiled = [
+            k for k in checked
+            if any(f.endswith(".class") for _, _, fs in os.walk(os.path.join(tmpdir, f"classes/{k}")) for f in fs)
+        ]
+        # Files that did not compile have no classes to analyze
+        skipped = failed if os.path.exists(spotbugs_bin) and compiled else set(files)
+
+        spotbugs_errors = {}
+        if len(skipped) < len(files):
+            # SpotBugs names sources by package path (com/acme/Main.java): a run
+            # gets units whose checked files' paths do not collide
+            layers = []
+            for k in compiled:
+                paths = {units[relpath][1]: name for relpath, name in by_relpath.items() if units[relpath][0] == roots[k]}
+                layer = next((l for l in layers if not paths.keys() & l[1].keys()), None)
+                if layer is None:
+                    layer = ([], {})
+                    layers.append(layer)
+                layer[0].append(os.path.join(tmpdir, f"classes/{k}"))
+                layer[1].update(paths)
+
+            calls = [_run_spotbugs(spotbugs_bin, dirs, len(names)) for dirs, names in layers]
+            for (_, names), outcome in zip(layers, tool_runner.run_all(calls)):
+                if isinstance(outcome, BaseException):
+                    spotbugs_errors.update((name, f"SpotBugs error: {str(outcome)}") for name in names.values())
+                    continue
+                for source_path, message in outcome:
+                    name = names.get(source_path)
+                    if name is not None and name not in failed:
+                        results[name][1].append(message)
+        for name in skipped:
+            results[name][1].append("ℹ️ Skipped SpotBugs (not found).")
+        # Keep javac's findings; only the SpotBugs part failed
+        for name, message in spotbugs_errors.items():
+            if name not in failed:
+                results[name] = tool_runner.ToolError(message, result=results[name])
+
+    return results
+
+
+async def _compile_java_unit(k: int, paths: Dict[str, str], results, cwd: str):
+    """Compile unit k's checked files into cwd/classes/k; returns the names that failed."""
+    failed = await _run_javac(k, list(paths), paths, results, cwd)
+    if failed and len(failed) < len(paths):
+        # Files with errors block every class file; compile the clean ones again on their own
+        await _run_javac(k, [p for p, n in paths.items() if n not in failed], paths, None, cwd)
+    return failed
+
+
+async def _run_javac(k: int, relpaths: List[str], sources: Dict[str, str], results, cwd: str):
+    """
+    Compile relpaths of unit k into cwd/classes/k; other files of the unit are
+    found through -sourcepath and checked, but get no class files. Errors go to
+    each file's syntax_errors, with its warnings when it has errors
+    (results=None discards diagnostics). Returns the names that failed to compile.
+    """
+    classes = f"classes/{k}"
+    os.makedirs(os.path.join(cwd, classes), exist_ok=True)
+    proc = await tool_runner.run_async(
+        ["javac", "-Xlint:all", "-implicit:none", "-d", classes, "-sourcepath", f"src/{k}", *relpaths],
+        timeout=JAVA_TIMEOUT * len(relpaths), cwd=cwd
+    )
+    diagnostics = {}
+    for line in proc.stderr.splitlines():
+        match = _JAVAC_DIAGNOSTIC.match(line)
+        if match and match.group(1) in sources:
+            relpath, lineno, kind, message = match.groups()
+            diagnostics.setdefault(sources[relpath], []).append((kind, f"Line {lineno}: {message}"))
+
+    failed = {name for name, found in diagnostics.items() if any(kind == "error" for kind, _ in found)}
+    if results is not None:
+        for name in failed:
+            results[name][0].extend(message for _, message in diagnostics[name])
+    return failed
+
+
+async def _run_spotbugs(spotbugs_bin: str, classes_dirs: List[str], file_count: int):
+    """(source path, "Line N: message (bug type)") for every SpotBugs finding."""
+    proc = await tool_runner.run_async(
+        [spotbugs_bin, "-textui", "-quiet", "-xml:withMessages", *classes_dirs],
+        timeout=JAVA_TIMEOUT * file_count + 15
+    )
+    if proc.returncode != 0 and not proc.stdout.strip():
+        raise RuntimeError(proc.stderr.strip() or f"spotbugs exited with {proc.returncode}")
+    diagnostics = []
+    for bug in ET.fromstring(proc.stdout).iter("BugInstance"):
+        # The BugInstance's own SourceLine is the primary location
+        line = bug.find("SourceLine")
+        if line is None:
+            continue
+        message = bug.findtext("LongMessage") or bug.findtext("ShortMessage") or bug.get("type")
+        diagnostics.append((line.get("sourcepath"), f"Line {line.get('start')}: {message} ({bug.get('type')})"))
+    return diagnostics
@@ -0,0 +1,66 @@
+// eslint_daemon.cjs
+// Warm ESLint for single-file lints (see eslint_runner.py).
+// Usage: node eslint_daemon.cjs <socket path> <config file>
+// Each connection sends one JSON line {"files": {name: code}} and gets back
+// {"results": {name: [eslint message, ...]}} or {"error": "..."}.
+const fs = require("fs");
+const net = require("net");
+const path = require("path");
+const { ESLint } = require("eslint");
+
+const [socketPath, configFile] = process.argv.slice(2);
+
+// Snippets are linted as if they lived next to the socket (a directory the
+// parent owns); flat config ignores files outside cwd
+const cwd = path.dirname(path.resolve(socketPath));
+const eslint = new ESLint({ cwd, overrideConfigFile: configFile });
+
+async function lintFiles(files) {
+  const results = {};
+  const names = Object.keys(files);
+  for (let i = 0; i < names.length; i++) {
+    const [result] = await eslint.lintText(files[names[i]], {
+      filePath: path.join(cwd, `snippet_${i}.js`),
+      warnIgnored: false,
+    });
+    results[names[i]] = result ? result.messages : [];
+  }
+  return results;
+}
+
+const server = net.createServer((connection) => {
+  let buffer = "";
+  connection.setEncoding("utf8");
+  connection.on("data", async (chunk) => {
+    buffer += chunk;
+    const newline = buffer.indexOf("\n");
+    if (newline < 0) return;
+    let reply;
+    try {
+      reply = { results: await lintFiles(JSON.parse(buffer.slice(0, newline)).files) };
+    } catch (e) {
+      reply = { error: String(e && e.message ? e.message : e) };
+    }
+    connection.end(JSON.stringify(reply) + "\n");
+  });
+  connection.on("error", () => {});
+});
+
+function shutdown() {
+  server.close();
+  process.exit(0);
+}
+
+// The parent holds our stdin; when it goes away, so do we
+process.stdin.on("end", shutdown);
+process.stdin.on("error", shutdown);
+process.stdin.resume();
+
+// Load the config before reporting ready, so the first real request is warm
+lintFiles({ warmup: "" }).then(() => {
+  if (fs.existsSync(socketPath)) fs.unlinkSync(socketPath);
+  server.listen(socketPath, () => process.stdout.write("ready\n"));
+}, (e) => {
+  process.stderr.write(String(e) + "\n");
+  process.exit(1);
+});
@@ -0,0 +1,206 @@
+import atexit
+import json
+import os
+import selectors
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from analysis import tool_runner
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+ESLINT_CONFIG = os.environ.get("ESLINT_CONFIG", os.path.join(ANALYSIS_DIR, "eslint.config.cjs"))
+ESLINT_TIMEOUT = float(os.environ.get("ESLINT_TIMEOUT", "10"))  # per file in a request
+DAEMON_SCRIPT = os.path.join(ANALYSIS_DIR, "eslint_daemon.cjs")
+# After the daemon fails to start (e.g. node cannot require("eslint")), lint()
+# goes straight to the CLI for this many seconds before trying it again
+DAEMON_RETRY_SECONDS = float(os.environ.get("ESLINT_DAEMON_RETRY", "300"))
+
+
+class ESLintError(tool_runner.ToolError):
+    """ESLint failed, timed out or could not be started."""
+
+
+def eslint_command():
+    """The package's own eslint (analysis/node_modules), else one on PATH, else None."""
+    local = os.path.join(ANALYSIS_DIR, "node_modules", ".bin", "eslint")
+    return local if os.access(local, os.X_OK) else shutil.which("eslint")
+
+
+def split_messages(messages: List[Dict]) -> Tuple[List[str], List[str]]:
+    """(syntax_errors, logic_issues) from ESLint messages; fatal ones are parse errors."""
+    syntax_errors, logic_issues = [], []
+    for m in messages:
+        if m.get("fatal"):
+            syntax_errors.append(f"Line {m.get('line', 0)}: {m['message']}")
+        else:
+            logic_issues.append(f"Line {m.get('line', 0)}: {m['message']} ({m.get('ruleId')})")
+    return syntax_errors, logic_issues
+
+
+# ----------------------------
+# Batch: one eslint run over every file
+# ----------------------------
+def lint_files(files: Dict[str, str]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """(syntax_errors, logic_issues) per name, from a single `eslint --format json` run."""
+    command = eslint_command()
+    if command is None:
+        raise ESLintError("eslint is not installed")
+
+    with tempfile.TemporaryDirectory(prefix="eslint_") as tmpdir:
+        names = {}
+        for i, (name, code) in enumerate(files.items()):
+            filename = f"snippet_{i}.js"
+            with open(os.path.join(tmpdir, filename), "w", encoding="utf-8") as f:
+                f.write(code)
+            names[filename] = name
+
+        # cwd is the temp dir: flat config ignores files outside its base path
+        proc = tool_runner.run(
+            [command, "--config", ESLINT_CONFIG, "--no-warn-ignored", "--format", "json", *names],
+            timeout=ESLINT_TIMEOUT * len(files) + 5, cwd=tmpdir
+        )
+    # Exit code 1 only means some file has lint errors
+    if proc.returncode not in (0, 1):
+        raise ESLintError(proc.stderr.strip() or f"eslint exited with {proc.returncode}")
+
+    results = {name: ([], []) for name in files}
+    for result in json.loads(proc.stdout or "[]"):
+        name = names.get(os.path.basename(result["filePath"]))
+        if name is not None:
+            results[name] = split_messages(result["messages"])
+    return results
+
+
+# ----------------------------
+# Interactive: warm daemon over a Unix socket
+# ----------------------------
+class ESLintDaemon:
+    """
+    A long-lived `node eslint_daemon.cjs`, so a single /analyze lint does not
+    pay Node start-up and config loading. It listens on a Unix socket and exits
+    when its parent closes its stdin. The process that started it owns it; a
+    forked child gets None from daemon() and falls back to lint_files().
+    """
+
+    def __init__(self, timeout: float = ESLINT_TIMEOUT):
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._dir = None
+        self._proc = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def socket_path(self):
+        return os.path.join(self._dir, "eslint.sock")
+
+    @property
+    def available(self):
+        """False for DAEMON_RETRY_SECONDS after a failed start."""
+        failed_at = self._failed_at
+        return failed_at is None or time.monotonic() - failed_at >= DAEMON_RETRY_SECONDS
+
+    def _start(self):
+        self._dir = self._dir or tempfile.mkdtemp(prefix="eslint_daemon_")
+        try:
+            self._proc = subprocess.Popen(
+                tool_runner.limited(["node", DAEMON_SCRIPT, self.socket_path, ESLINT_CONFIG]),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                cwd=ANALYSIS_DIR, text=True,
+            )
+        except (OSError, tool_runner.ToolError) as e:
+            self._failed_at = time.monotonic()
+            raise ESLintError(f"eslint daemon did not start: {e}")
+        # Wait for "ready": Node has loaded ESLint and the config
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._proc.stdout, selectors.EVENT_READ)
+            ready = selector.select(self.timeout + 5) and self._proc.stdout.readline().strip() == "ready"
+        if not ready:
+            self._stop()
+            self._failed_at = time.monotonic()
+            raise ESLintError("eslint daemon did not start")
+        self._failed_at = None
+
+    def _stop(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def lint(self, files: Dict[str, str]) -> Dict[str, List[Dict]]:
+        """Raw ESLint messages per name."""
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+
+        with tool_runner.slot("eslint"):
+            data = self._send(files)
+
+        if not data:
+            raise ESLintError("eslint daemon closed the connection")
+        reply = json.loads(data)
+        if "error" in reply:
+            raise ESLintError(reply["error"])
+        return reply["results"]
+
+    def _send(self, files: Dict[str, str]) -> bytes:
+        deadline = time.monotonic() + self.timeout * len(files)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.timeout * len(files))
+                connection.connect(self.socket_path)
+                connection.sendall((json.dumps({"files": files}) + "\n").encode("utf-8"))
+                data = b""
+                while not data.endswith(b"\n"):
+                    connection.settimeout(max(0.01, deadline - time.monotonic()))
+                    chunk = connection.recv(65536)
+                    if not chunk:
+                        break
+                    data += chunk
+        except OSError as e:
+            # A hung daemon is replaced on the next request
+            with self._lock:
+                self._stop()
+            raise ESLintError(f"eslint daemon failed: {e}")
+        return data
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None:
+                try:
+                    self._proc.stdin.close()
+                except OSError:
+                    pass
+            self._stop()
+        if self._dir:
+            shutil.rmtree(self._dir, ignore_errors=True)
+
+
+_daemon = None
+_daemon_lock = threading.Lock()
+
+
+def daemon():
+    """The process-wide daemon, or None in a forked child of the process that owns it."""
+    global _daemon
+    with _daemon_lock:
+        if _daemon is None:
+            _daemon = ESLintDaemon()
+            atexit.register(_daemon.close)
+        return _daemon if _daemon.pid == os.getpid() else None
+
+
+def lint(code: str) -> Tuple[List[str], List[str]]:
+    """(syntax_errors, logic_issues) for one snippet, through the daemon when possible."""
+    warm = daemon()
+    if warm is not None and warm.available:
+        try:
+            return split_messages(warm.lint({"snippet": code})["snippet"])
+        except ESLintError:
+            pass  # e.g. node cannot load eslint as a module; the CLI may still work
+    return lint_files({"snippet": code})["snippet"]
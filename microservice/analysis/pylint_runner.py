@@ -0,0 +1,233 @@
+import atexit
+import io
+import json
+import os
+import queue
+import selectors
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from analysis import tool_runner
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PYLINT_ARGS = [
+    "--disable=all", "--enable=E,F,W,R,C",
+    # Files linted together are unrelated submissions, not one package
+    "--disable=duplicate-code,cyclic-import",
+    "--persistent=n", "--score=n",
+]
+PYLINT_WORKERS = int(os.environ.get("PYLINT_WORKERS", "2"))
+PYLINT_TIMEOUT = float(os.environ.get("PYLINT_TIMEOUT", "10"))  # per file in a request
+
+
+class PylintError(tool_runner.ToolError):
+    """A pylint worker failed, timed out or could not be started."""
+
+
+def format_message(message: Dict) -> str:
+    # Same shape the text-output parser (clean_pylint_output) produced
+    return f"Line {message['line']}: {message['message']} ({message['symbol']})"
+
+
+# ----------------------------
+# Worker side (python -m analysis.pylint_runner)
+# ----------------------------
+def serve():
+    """
+    Lint requests read from stdin, one JSON line each: {"files": {name: code}}.
+    Replies {"results": {name: [message, ...]}} or {"error": "..."} on stdout.
+    pylint and astroid are imported once and stay warm between requests.
+    """
+    from pylint.lint import Run
+    from pylint.reporters import JSONReporter
+    import astroid
+
+    # The protocol owns the real stdout; anything pylint prints goes to stderr
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    for request_number, line in enumerate(sys.stdin):
+        try:
+            files = json.loads(line)["files"]
+            results = {name: [] for name in files}
+            with tempfile.TemporaryDirectory(prefix="pylint_") as tmpdir:
+                modules, paths = {}, []
+                for i, (name, code) in enumerate(files.items()):
+                    module = f"snippet_{request_number}_{i}"
+                    path = os.path.join(tmpdir, module + ".py")
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(code)
+                    modules[module] = name
+                    paths.append(path)
+
+                out = io.StringIO()
+                try:
+                    Run([*PYLINT_ARGS, *paths], reporter=JSONReporter(out), exit=False)
+                finally:
+                    # Forget only the snippets: a full clear_cache() would rebuild
+                    # the builtins (most of a cold start) on every request.
+                    for module in modules:
+                        astroid.MANAGER.astroid_cache.pop(module, None)
+
+            for message in json.loads(out.getvalue() or "[]"):
+                name = modules.get(message.get("module"))
+                if name is not None:
+                    results[name].append(format_message(message))
+            reply = {"results": results}
+        except Exception as e:
+            reply = {"error": f"{type(e).__name__}: {e}"}
+        protocol.write(json.dumps(reply) + "\n")
+        protocol.flush()
+
+
+# ----------------------------
+# Client side
+# ----------------------------
+class PylintPool:
+    """
+    Long-lived pylint worker processes fed over pipes. lint_many() spreads a
+    set of files over the workers and lints each share in a single pylint run,
+    so interpreter start-up and astroid imports are paid once per worker, not
+    once per file. Workers belong to the process that started them; a forked
+    child gets None from pool() and falls back to one-shot runs.
+    """
+
+    def __init__(self, size: int = PYLINT_WORKERS, timeout: float = PYLINT_TIMEOUT):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+        for _ in range(self.size):
+            self._idle.put(None)  # a slot; the worker is started on first use
+
+    def _spawn(self):
+        proc = subprocess.Popen(
+            # Memory limit only; the worker outlives any CPU budget
+            tool_runner.limited([sys.executable, "-m", "analysis.pylint_runner"], "pylint"),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=PACKAGE_DIR, text=True, encoding="utf-8",
+        )
+        with self._lock:
+            self._all.append(proc)
+        return proc
+
+    def _discard(self, proc):
+        proc.kill()
+        proc.wait()
+        with self._lock:
+            if proc in self._all:
+                self._all.remove(proc)
+
+    def _request(self, files: Dict[str, str]) -> Dict[str, List[str]]:
+        # A request holds a pylint slot while it runs, like a one-shot process would
+        with tool_runner.slot("pylint"):
+            return self._send(files)
+
+    def _send(self, files: Dict[str, str]) -> Dict[str, List[str]]:
+        proc = self._idle.get()
+        try:
+            if proc is None or proc.poll() is not None:
+                proc = self._spawn()
+            proc.stdin.write(json.dumps({"files": files}) + "\n")
+            proc.stdin.flush()
+
+            # Cold workers pay the pylint import on their first request
+            deadline = time.monotonic() + self.timeout * len(files) + 5
+            with selectors.DefaultSelector() as selector:
+                selector.register(proc.stdout, selectors.EVENT_READ)
+                if not selector.select(max(0.0, deadline - time.monotonic())):
+                    self._discard(proc)
+                    proc = None
+                    raise PylintError(f"pylint timed out on {len(files)} file(s)")
+            line = proc.stdout.readline()
+            if not line:
+                self._discard(proc)
+                proc = None
+                raise PylintError("pylint worker exited unexpectedly")
+        except (OSError, ValueError) as e:
+            if proc is not None:
+                self._discard(proc)
+                proc = None
+            raise PylintError(f"pylint worker failed: {e}")
+        finally:
+            self._idle.put(proc)
+
+        reply = json.loads(line)
+        if "error" in reply:
+            raise PylintError(reply["error"])
+        return reply["results"]
+
+    def lint_many(self, files: Dict[str, str]) -> Dict[str, List[str]]:
+        """Messages per file name for every file, using all workers in parallel."""
+        if not files:
+            return {}
+        names = list(files)
+        shares = [names[i::self.size] for i in range(self.size) if names[i::self.size]]
+        if len(shares) == 1:
+            return self._request(files)
+        with ThreadPoolExecutor(len(shares)) as executor:
+            parts = executor.map(lambda share: self._request({n: files[n] for n in share}), shares)
+            results = {}
+            for part in parts:
+                results.update(part)
+        return results
+
+    def close(self):
+        with self._lock:
+            workers, self._all = self._all, []
+        for proc in workers:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+            proc.kill()
+            proc.wait()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """The process-wide pool, or None in a forked child of the process that owns it."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PylintPool()
+            atexit.register(_pool.close)
+        return _pool if _pool.pid == os.getpid() else None
+
+
+def lint_many(files: Dict[str, str]) -> Dict[str, List[str]]:
+    """Lint several snippets in one pass of the warm workers."""
+    workers = pool()
+    if workers is None:
+        return {name: run_pylint_once(code) for name, code in files.items()}
+    return workers.lint_many(files)
+
+
+def lint(code: str) -> List[str]:
+    return lint_many({"snippet": code})["snippet"]
+
+
+def run_pylint_once(code: str) -> List[str]:
+    """One-shot pylint subprocess, for processes that do not own the pool."""
+    with tempfile.TemporaryDirectory(prefix="pylint_") as tmpdir:
+        path = os.path.join(tmpdir, "snippet.py")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+        proc = tool_runner.run(["pylint", *PYLINT_ARGS, "--output-format=json", path], timeout=PYLINT_TIMEOUT)
+    return [format_message(m) for m in json.loads(proc.stdout or "[]")]
+
+
+if __name__ == "__main__":
+    serve()
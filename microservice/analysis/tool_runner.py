@@ -0,0 +1,378 @@
+import asyncio
+import atexit
+import math
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows; children then run without rlimits
+    resource = None
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; slots then only hold within a process
+    fcntl = None
+
+
+def _parse_limits(text: str) -> Dict[str, int]:
+    limits = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+# External tool processes running at once, over all tools
+TOOL_MAX_PROCS = int(os.environ.get("TOOL_MAX_PROCS", str(max(2, os.cpu_count() or 1))))
+# Per-tool caps below the global one, e.g. TOOL_LIMITS="javac=2,spotbugs=1"
+DEFAULT_TOOL_LIMITS = {"javac": 2, "spotbugs": 1, "cppcheck": 1}
+TOOL_LIMITS = {**DEFAULT_TOOL_LIMITS, **_parse_limits(os.environ.get("TOOL_LIMITS", ""))}
+
+# RLIMIT_AS per tool process (0 = none). JVMs and Node reserve far more address
+# space than they use, so they only get the CPU limit.
+TOOL_MEMORY_BYTES = int(os.environ.get("TOOL_MEMORY_BYTES", str(2 * 1024 * 1024 * 1024)))
+NO_MEMORY_LIMIT = {"java", "javac", "spotbugs", "node", "eslint"}
+# RLIMIT_CPU per process, as a multiple of its wall-clock timeout; it stops
+# grandchildren that keep burning CPU after a timed-out tool was killed
+TOOL_CPU_FACTOR = float(os.environ.get("TOOL_CPU_FACTOR", "2"))
+
+
+class ToolError(RuntimeError):
+    """
+    An external tool failed, timed out or could not be started. Results it
+    would have contributed to are incomplete and must not be cached. result,
+    if set, is what the other tools of the check still found, e.g. javac's
+    (syntax_errors, logic_issues) when only SpotBugs failed.
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def tool_name(cmd: Sequence[str]) -> str:
+    return os.path.basename(cmd[0])
+
+
+# ----------------------------
+# Resource limits
+# ----------------------------
+# Limits are applied by an exec wrapper rather than a preexec_fn, which is not
+# safe to run in a child forked from a threaded process: util-linux prlimit
+# when installed, else a short Python shim that sets them and execs the tool
+PRLIMIT = shutil.which("prlimit")
+_EXEC_WITH_LIMITS = (
+    "import os, resource, sys\n"
+    "for kind, value in ((resource.RLIMIT_CPU, sys.argv[1]), (resource.RLIMIT_AS, sys.argv[2])):\n"
+    "    if value:\n"
+    "        resource.setrlimit(kind, (int(value), resource.getrlimit(kind)[1]))\n"
+    "os.execvp(sys.argv[3], sys.argv[3:])\n"
+)
+
+
+def _soft_limit(kind, value):
+    # A soft limit may not exceed the hard one the child inherits from us
+    _, hard = resource.getrlimit(kind)
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+def limited(cmd: Sequence[str], tool: Optional[str] = None, timeout: Optional[float] = None) -> List[str]:
+    """
+    cmd wrapped to run under the tool's RLIMIT_CPU (from timeout) and RLIMIT_AS,
+    if any. Raises ToolError when cmd is not installed: the wrapper would
+    otherwise start, fail to exec it and exit 127 like a finished tool.
+    """
+    tool = tool or tool_name(cmd)
+    if shutil.which(cmd[0]) is None:
+        raise ToolError(f"{tool} is not installed")
+    if resource is None:
+        return list(cmd)
+    cpu = math.ceil(timeout * TOOL_CPU_FACTOR) + 1 if timeout else None
+    memory = TOOL_MEMORY_BYTES if TOOL_MEMORY_BYTES > 0 and tool not in NO_MEMORY_LIMIT else None
+    cpu = _soft_limit(resource.RLIMIT_CPU, cpu) if cpu is not None else None
+    memory = _soft_limit(resource.RLIMIT_AS, memory) if memory is not None else None
+    if cpu is None and memory is None:
+        return list(cmd)
+
+    if PRLIMIT:
+        # "N:" sets the soft limit only
+        options = [f"--{name}={value}:" for name, value in (("cpu", cpu), ("as", memory)) if value is not None]
+        return [PRLIMIT, *options, "--", *cmd]
+    return [sys.executable, "-c", _EXEC_WITH_LIMITS, str(cpu or ""), str(memory or ""), *cmd]
+
+
+# ----------------------------
+# Concurrency slots and statistics
+# ----------------------------
+# Slots are lock files shared by every process forked from this one (batch
+# pool workers, job workers), so the limits hold across processes; the kernel
+# releases a slot whose holder died, e.g. a pool worker killed on timeout
+SLOTS_DIR = os.environ.get("TOOL_SLOTS_DIR") or tempfile.mkdtemp(prefix="tool_slots_")
+_slots_owner = os.getpid()
+
+
+@atexit.register
+def _remove_slots_dir():
+    if os.getpid() == _slots_owner and "TOOL_SLOTS_DIR" not in os.environ:
+        shutil.rmtree(SLOTS_DIR, ignore_errors=True)
+
+
+class _Slots:
+    """count slots of one name: slot files under SLOTS_DIR held with flock."""
+
+    def __init__(self, name: str, count: int):
+        self.paths = [os.path.join(SLOTS_DIR, f"{name}.{i}") for i in range(max(1, count))]
+        self._next = 0
+
+    def acquire(self) -> int:
+        """Block until a slot is free; returns the fd holding it."""
+        delay = 0.005
+        while True:
+            for i in range(len(self.paths)):
+                # Start at a different slot each time, so waiters spread out
+                path = self.paths[(self._next + i) % len(self.paths)]
+                fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                self._next += 1
+                with _lock:
+                    _held.add(fd)
+                return fd
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    @staticmethod
+    def release(fd: int):
+        with _lock:
+            _held.discard(fd)
+        os.close(fd)
+
+
+class _ThreadSlots:
+    """_Slots for platforms without flock: this process only."""
+
+    def __init__(self, name: str, count: int):
+        self._semaphore = threading.BoundedSemaphore(max(1, count))
+
+    def acquire(self):
+        self._semaphore.acquire()
+
+    def release(self, _):
+        self._semaphore.release()
+
+
+_lock = threading.Lock()
+_held = set()  # slot fds held by this process's threads
+_slot_type = _Slots if fcntl is not None else _ThreadSlots
+_global_slots = _slot_type("_all", TOOL_MAX_PROCS)
+_tool_slots = {tool: _slot_type(tool, limit) for tool, limit in TOOL_LIMITS.items()}
+_stats: Dict[str, Dict] = {}
+
+
+def _reset_after_fork():
+    # The child shares the slot files but not the parent's threads: close the
+    # fds they held, or those slots would stay taken while the child lives
+    global _lock, _global_slots, _tool_slots
+    _lock = threading.Lock()
+    for fd in _held:
+        os.close(fd)
+    _held.clear()
+    _running.clear()
+    _stats.clear()
+    if fcntl is None:
+        _global_slots = _slot_type("_all", TOOL_MAX_PROCS)
+        _tool_slots = {tool: _slot_type(tool, limit) for tool, limit in TOOL_LIMITS.items()}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _new_stats():
+    return {
+        "runs": 0, "timeouts": 0, "errors": 0, "waiting": 0, "running": 0,
+        "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+        "run_seconds": 0.0, "max_run_seconds": 0.0,
+    }
+
+
+def _enter(tool: str) -> Tuple[float, Tuple]:
+    """Wait for a slot of the tool, then a global one; returns the start time and the slots held."""
+    with _lock:
+        record = _stats.setdefault(tool, _new_stats())
+        record["waiting"] += 1
+    tool_slots = _tool_slots.get(tool)
+
+    queued = time.monotonic()
+    # Tool slot first, so a queue of javac runs does not sit on global slots
+    tool_slot = tool_slots.acquire() if tool_slots is not None else None
+    global_slot = _global_slots.acquire()
+    started = time.monotonic()
+
+    with _lock:
+        record["waiting"] -= 1
+        record["running"] += 1
+        record["wait_seconds"] += started - queued
+        record["max_wait_seconds"] = max(record["max_wait_seconds"], started - queued)
+    return started, (tool_slot, global_slot)
+
+
+def _exit(tool: str, entered: Tuple[float, Tuple], outcome: str):
+    started, (tool_slot, global_slot) = entered
+    _global_slots.release(global_slot)
+    if tool in _tool_slots:
+        _tool_slots[tool].release(tool_slot)
+    elapsed = time.monotonic() - started
+    with _lock:
+        record = _stats[tool]
+        record["running"] -= 1
+        record["runs"] += 1
+        record["run_seconds"] += elapsed
+        record["max_run_seconds"] = max(record["max_run_seconds"], elapsed)
+        if outcome in ("timeouts", "errors"):
+            record[outcome] += 1
+
+
+@contextmanager
+def slot(tool: str):
+    """
+    Hold one of the tool's concurrency slots (and a global one) for the block.
+    Long-lived workers (pylint, the ESLint daemon) take a slot per request.
+    """
+    entered = _enter(tool)
+    outcome = "ok"
+    try:
+        yield
+    except subprocess.TimeoutExpired:
+        outcome = "timeouts"
+        raise
+    except BaseException:
+        outcome = "errors"
+        raise
+    finally:
+        _exit(tool, entered, outcome)
+
+
+def stats() -> Dict:
+    """Queue-wait and run-time statistics per tool since start-up."""
+    with _lock:
+        tools = {}
+        for tool, record in sorted(_stats.items()):
+            runs = record["runs"] or 1
+            tools[tool] = {
+                **record,
+                "limit": TOOL_LIMITS.get(tool),
+                "avg_wait_seconds": record["wait_seconds"] / runs,
+                "avg_run_seconds": record["run_seconds"] / runs,
+            }
+    return {
+        "max_procs": TOOL_MAX_PROCS,
+        "memory_limit_bytes": TOOL_MEMORY_BYTES or None,
+        "cpu_factor": TOOL_CPU_FACTOR,
+        "tools": tools,
+    }
+
+
+# ----------------------------
+# Running tools
+# ----------------------------
+# Tools run in their own session, outside the process group of a batch pool
+# worker; the worker kills them through kill_running() when it is stopped
+_running = set()  # session ids (= pids) of this process's running tools
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_running():
+    """Kill every tool this process is running, with all it started. Safe in a signal handler."""
+    for pid in list(_running):
+        _kill_group(pid)
+
+
+def run(cmd: List[str], timeout: float, cwd: Optional[str] = None,
+        tool: Optional[str] = None) -> subprocess.CompletedProcess:
+    """
+    subprocess.run(cmd, capture_output=True, text=True, timeout=timeout) under
+    the tool's concurrency slot and resource limits. The tool runs in its own
+    session, so a timeout kills everything it started (gcc's cc1, the JVM
+    behind spotbugs) before TimeoutExpired is raised.
+    """
+    tool = tool or tool_name(cmd)
+    with slot(tool):
+        proc = subprocess.Popen(
+            limited(cmd, tool, timeout), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, text=True, cwd=cwd, start_new_session=True,
+        )
+        _running.add(proc.pid)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except BaseException:
+            _kill_group(proc.pid)
+            proc.communicate()
+            raise
+        finally:
+            _running.discard(proc.pid)
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+async def run_async(cmd: List[str], timeout: float, cwd: Optional[str] = None,
+                    tool: Optional[str] = None) -> subprocess.CompletedProcess:
+    """run() for asyncio: several tools of one request can overlap (see run_all)."""
+    tool = tool or tool_name(cmd)
+    entered = await asyncio.to_thread(_enter, tool)
+    outcome = "ok"
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *limited(cmd, tool, timeout), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, cwd=cwd, start_new_session=True,
+        )
+        _running.add(proc.pid)
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except BaseException:
+            _kill_group(proc.pid)
+            await proc.wait()
+            raise
+        finally:
+            _running.discard(proc.pid)
+    except asyncio.TimeoutError:
+        outcome = "timeouts"
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    except BaseException:
+        outcome = "errors"
+        raise
+    finally:
+        _exit(tool, entered, outcome)
+    return subprocess.CompletedProcess(
+        cmd, proc.returncode, stdout.decode("utf-8", "replace"), stderr.decode("utf-8", "replace")
+    )
+
+
+def run_all(calls: Sequence[Awaitable]) -> List:
+    """
+    Await run_async() calls (or any awaitables) concurrently from synchronous
+    code. Results come back in order; a call that raised is returned as its
+    exception, for the caller to re-raise or report.
+    """
+    async def gather():
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    return asyncio.run(gather())
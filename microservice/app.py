@@ -1,20 +1,60 @@
-from flask import Flask, request, jsonify
+import json
+import os
+import tempfile
+import threading
+
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS 
+from werkzeug.datastructures import FileStorage
 
 # Import analyzers
 from analysis.javascript_analyzer import analyze_javascript
 from analysis.python_analyzer import analyze_python
 from analysis.c_cpp_analyzer import analyze_c_cpp
+from analysis.cache import analysis_cache
+from analysis import tool_runner
 
 from plagiarism.checker import perform_plagiarism_check  
+from plagiarism.corpus import perform_corpus_check, perform_screened_check
+from plagiarism.fingerprint import DEFAULT_MAX_DOC_FREQUENCY
+from plagiarism.matrix import similarity_matrix, top_k_neighbors
+from plagiarism.store import FingerprintStore
+from plagiarism.tiling import DEFAULT_MIN_MATCH
 
-from batch.processor import analyze_file,process_batch
+from batch.processor import analyze_file,process_batch,iter_batch_records
+from batch.jobs import JobQueue
+from batch.manifest import ManifestStore, repo_key
+from batch.report import compact_report, encode_report
+from batch.triage import build_triage
 
 from viva.viva_service import generate_viva_questions
 
 app = Flask(__name__)
 CORS(app)
 
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def fingerprint_archive():
+    """The fingerprint archive, opened (and its database created) on first use."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = FingerprintStore()
+        return _archive
+
+
+job_queue = JobQueue()
+manifests = ManifestStore()
+
+
+@app.before_request
+def _start_job_workers():
+    # WSGI servers never run __main__; start_workers() starts the workers once
+    # per process under its own lock, and later calls only replace dead ones
+    job_queue.start_workers()
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
     data = request.get_json()
@@ -24,21 +64,38 @@ def analyze():
     if not code or not language:
         return jsonify({"error": "Missing code or language"}), 400
 
-    try:
-        if language == "python":
-            report = analyze_python(code)
-        elif language == "javascript":
-            report = analyze_javascript(code)
-        elif language in ["c", "cpp", "c++"]:
-            report = analyze_c_cpp(code, language)
-        else:
-            return jsonify({"error": f"Unsupported language: {language}"}), 400
+    if language not in ["python", "javascript", "c", "cpp", "c++"]:
+        return jsonify({"error": f"Unsupported language: {language}"}), 400
 
+    try:
+        report = analysis_cache.cached("analyze", code, language, lambda: _run_analyzer(code, language))
         return jsonify(report)   # ✅ return consistent JSON
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _run_analyzer(code, language):
+    if language == "python":
+        return analyze_python(code)
+    elif language == "javascript":
+        return analyze_javascript(code)
+    return analyze_c_cpp(code, language)
+
+
+@app.route("/analyze/cache", methods=["GET", "DELETE"])
+def analyze_cache():
+    # Hit / miss counters of the result cache shared with /batch; DELETE empties it
+    if request.method == "DELETE":
+        analysis_cache.clear()
+    return jsonify(analysis_cache.stats())
+
+
+@app.route("/analyze/tools", methods=["GET"])
+def analyze_tools():
+    # Concurrency limits plus queue-wait / run-time stats of the external linters and compilers
+    return jsonify(tool_runner.stats())
+
+
 @app.route("/plagiarism", methods=["POST"])
 def plagiarism():
     data = request.get_json()
@@ -50,29 +107,326 @@ def plagiarism():
         return jsonify({"error": "Missing code1/code2/language"}), 400
 
     try:
-        result = perform_plagiarism_check(code1, code2, language)
+        min_match = int(data.get("min_match_length", DEFAULT_MIN_MATCH))
+        if min_match < 1:
+            return jsonify({"error": "min_match_length must be at least 1"}), 400
+        result = perform_plagiarism_check(
+            code1, code2, language,
+            min_match_length=min_match,
+            full_scoring=bool(data.get("full_scoring", False))
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/plagiarism/corpus", methods=["POST"])
+def plagiarism_corpus():
+    data = request.get_json()
+    submissions = data.get("submissions", [])
+    language = data.get("language", "").lower()
+
+    if len(submissions) < 2 or not language:
+        return jsonify({"error": "Provide at least two submissions and a language"}), 400
+
+    try:
+        result = perform_corpus_check(
+            submissions, language,
+            top_n=int(data.get("top_n", 20)),
+            # Fingerprints in more submissions than this are ignored as boilerplate; 0 = no cap
+            max_doc_frequency=int(data.get("max_doc_frequency", DEFAULT_MAX_DOC_FREQUENCY))
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/plagiarism/screen", methods=["POST"])
+def plagiarism_screen():
+    data = request.get_json()
+    submissions = data.get("submissions", [])
+    language = data.get("language", "").lower()
+
+    if len(submissions) < 2 or not language:
+        return jsonify({"error": "Provide at least two submissions and a language"}), 400
+
+    try:
+        if int(data.get("bands", 50)) < 1 or int(data.get("rows", 3)) < 1:
+            return jsonify({"error": "bands and rows must be at least 1"}), 400
+        result = perform_screened_check(
+            submissions, language,
+            threshold=float(data.get("threshold", 0.4)),
+            bands=int(data.get("bands", 50)),
+            rows=int(data.get("rows", 3)),
+            top_n=int(data.get("top_n", 50))
+        )
         return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+
+@app.route("/plagiarism/matrix", methods=["POST"])
+def plagiarism_matrix():
+    # Cohort heatmap: full matrix, or top-k neighbours per submission for large classes
+    data = request.get_json()
+    submissions = data.get("submissions", [])
+    language = data.get("language", "").lower()
+    metric = data.get("metric", "cosine").lower()
+
+    if len(submissions) < 2 or not language:
+        return jsonify({"error": "Provide at least two submissions and a language"}), 400
+
+    try:
+        if "k" in data:
+            result = top_k_neighbors(submissions, language, k=int(data["k"]), metric=metric)
+        else:
+            result = similarity_matrix(submissions, language, metric=metric)
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/plagiarism/archive", methods=["POST"])
+def plagiarism_archive_add():
+    # Accept one submission or {"submissions": [...]} for bulk imports
+    data = request.get_json()
+    submissions = data.get("submissions") or [data]
+
+    for sub in submissions:
+        if sub.get("id") is None or not sub.get("code") or not sub.get("language"):
+            return jsonify({"error": "Each submission needs id, code and language"}), 400
+
+    try:
+        archive = fingerprint_archive()
+        archive.add_many(submissions)
+        return jsonify({"archived": len(submissions), **archive.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/plagiarism/archive/<label>", methods=["DELETE"])
+def plagiarism_archive_remove(label):
+    if not fingerprint_archive().remove(label):
+        return jsonify({"error": f"Unknown submission: {label}"}), 404
+    return jsonify({"removed": label})
+
+
+@app.route("/plagiarism/archive/lookup", methods=["POST"])
+def plagiarism_archive_lookup():
+    data = request.get_json()
+    code = data.get("code", "")
+    language = data.get("language", "").lower()
+
+    if not code or not language:
+        return jsonify({"error": "Missing code or language"}), 400
+
+    try:
+        matches = fingerprint_archive().lookup(code, language, top_n=int(data.get("top_n", 10)))
+        return jsonify({"matches": matches})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/plagiarism/archive/compact", methods=["POST"])
+def plagiarism_archive_compact():
+    try:
+        return jsonify(fingerprint_archive().compact())
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
 
+def _stream_format(options):
+    # "ndjson" / "sse" from the request body or form, else from the Accept header
+    fmt = str(options.get("stream", "")).lower()
+    if fmt in ["ndjson", "sse"]:
+        return fmt
+    if request.accept_mimetypes.best == "text/event-stream":
+        return "sse"
+    if request.accept_mimetypes.best == "application/x-ndjson":
+        return "ndjson"
+    return None
+
+
+def _stream_batch(records, fmt):
+    # One line (NDJSON) or one event (SSE) per record, flushed as each file finishes
+    def encode(record):
+        if fmt == "sse":
+            return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+        return json.dumps(record) + "\n"
+
+    def generate():
+        # The status line is already sent: a failure becomes the last record
+        try:
+            for record in records:
+                yield encode(record)
+        except Exception as e:
+            yield encode({"type": "error", "error": str(e)})
+
+    mimetype = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def _triage_options(options):
+    # "ignore": extra globs (list or comma-separated); "triage": false disables the built-in rules
+    enabled = str(options.get("triage", "true")).lower() not in ["0", "false", "no"]
+    return {"ignore": options.get("ignore") or [], "triage": enabled}
+
+
+def _triage_for(options):
+    triage_options = _triage_options(options)
+    return build_triage(triage_options["ignore"], triage_options["triage"])
+
+
+def _report_response(report, status, options):
+    # "report_format": "compact" interns repeated messages; "encoding": json / gzip / msgpack
+    # (defaults: msgpack if the client accepts only that, gzip if it accepts gzip, else json)
+    if status != 200:
+        return jsonify(report), status
+    if str(options.get("report_format", "")).lower() == "compact":
+        report = compact_report(report)
+
+    encoding = options.get("encoding")
+    if not encoding:
+        if request.accept_mimetypes.best == "application/msgpack":
+            encoding = "msgpack"
+        elif request.accept_encodings["gzip"]:
+            encoding = "gzip"
+        else:
+            encoding = "json"
+    try:
+        body, mimetype, content_encoding = encode_report(report, str(encoding).lower())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 406
+
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    return response
+
+
 @app.route("/batch", methods=["POST"])
 def batch():
     # Accept multipart zip OR JSON with github_url
     try:
         if "file" in request.files:
             f = request.files["file"]
-            return jsonify(process_batch("upload", f)), 200
+            detect_duplicates = request.form.get("detect_duplicates", "").lower() in ["1", "true", "yes"]
+            triage = _triage_for(request.form)
+            fmt = _stream_format(request.form)
+            if fmt:
+                # The request's upload is closed before the response body runs, so hand the stream its own copy
+                spool = tempfile.TemporaryFile()
+                f.save(spool)
+                upload = FileStorage(stream=spool, filename=f.filename)
+                response = _stream_batch(
+                    iter_batch_records("upload", upload, detect_duplicates=detect_duplicates, triage=triage), fmt
+                )
+                response.call_on_close(spool.close)
+                return response
+            incremental = request.form.get("incremental", "").lower() in ["1", "true", "yes"]
+            report, status = process_batch(
+                "upload", f, detect_duplicates=detect_duplicates,
+                manifest=manifests if incremental else None,
+                manifest_key=request.form.get("manifest_key") or None,
+                triage=triage
+            )
+            return _report_response(report, status, request.form)
         elif request.is_json:
             body = request.get_json()
             if "github_url" in body:
-                report, status = process_batch("github", body["github_url"])
-                return jsonify(report), status
+                detect_duplicates = bool(body.get("detect_duplicates", False))
+                triage = _triage_for(body)
+                fmt = _stream_format(body)
+                if fmt:
+                    return _stream_batch(
+                        iter_batch_records("github", body["github_url"], detect_duplicates=detect_duplicates,
+                                           triage=triage), fmt
+                    )
+                report, status = process_batch(
+                    "github", body["github_url"],
+                    detect_duplicates=detect_duplicates,
+                    manifest=manifests if body.get("incremental") else None,
+                    manifest_key=body.get("manifest_key"),
+                    triage=triage
+                )
+                return _report_response(report, status, body)
         return jsonify({"error": "Provide zip file or github_url"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500       
 
 
+@app.route("/batch/manifest", methods=["DELETE"])
+def batch_manifest_forget():
+    # Drop a repo's stored file reports, so its next incremental run starts fresh
+    body = request.get_json() or {}
+    if "github_url" in body:
+        key = repo_key("github", body["github_url"])
+    elif body.get("manifest_key"):
+        key = body["manifest_key"]
+    else:
+        return jsonify({"error": "Provide github_url or manifest_key"}), 400
+    return jsonify({"manifest": key, "files_removed": manifests.forget(key)})
+
+
+@app.route("/batch/jobs", methods=["POST"])
+def batch_job_submit():
+    # Same inputs as /batch, but returns a job ID right away
+    try:
+        if "file" in request.files:
+            options = {
+                "detect_duplicates": request.form.get("detect_duplicates", "").lower() in ["1", "true", "yes"],
+                **_triage_options(request.form)
+            }
+            job_id = job_queue.submit_upload(request.files["file"], options)
+        elif request.is_json and "github_url" in request.get_json():
+            body = request.get_json()
+            options = {"detect_duplicates": bool(body.get("detect_duplicates", False)), **_triage_options(body)}
+            job_id = job_queue.submit_github(body["github_url"], options)
+        else:
+            return jsonify({"error": "Provide zip file or github_url"}), 400
+        return jsonify({"job_id": job_id, "status": "queued"}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/batch/jobs/<job_id>", methods=["GET"])
+def batch_job_status(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(status)
+
+
+@app.route("/batch/jobs/<job_id>/files", methods=["GET"])
+def batch_job_files(job_id):
+    # Partial results: files finished so far, paged with offset / limit
+    if job_queue.status(job_id) is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    offset = int(request.args.get("offset", 0))
+    limit = int(request.args.get("limit", 100))
+    return jsonify({"job_id": job_id, "offset": offset, "files": job_queue.files(job_id, offset, limit)})
+
+
+@app.route("/batch/jobs/<job_id>/report", methods=["GET"])
+def batch_job_report(job_id):
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if status["status"] != "done":
+        return jsonify(status), 409
+    return _report_response(job_queue.report(job_id), 200, request.args)
+
 
 @app.route("/viva", methods=["POST"])
 def viva():
@@ -95,4 +449,8 @@ def viva():
 
 
 if __name__ == "__main__":
+    # Resume unfinished batch jobs at boot, in the serving process (the
+    # reloader's child, not the watching parent)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        job_queue.start_workers()
     app.run(port=8000, debug=True)
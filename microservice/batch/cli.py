@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import sys
+
+from batch.processor import DEFAULT_FILE_TIMEOUT, DEFAULT_WORKERS, iter_batch_records
+from batch.triage import build_triage
+
+# Exit codes
+EXIT_OK = 0
+EXIT_THRESHOLD = 1   # a repo went over one of the --max-* limits
+EXIT_ERROR = 3       # a repo could not be analyzed (argparse already uses 2)
+
+THRESHOLDS = {
+    "max_syntax_errors": "syntax_errors_found",
+    "max_logic_issues": "logic_issues_found",
+    "max_files_with_errors": "files_with_errors",
+    "max_timeouts": "files_timed_out",
+}
+
+
+def _repositories(paths, each):
+    for path in paths:
+        if not each:
+            yield path
+            continue
+        for name in sorted(os.listdir(path)):
+            child = os.path.join(path, name)
+            if os.path.isdir(child) and not name.startswith("."):
+                yield child
+
+
+def _exceeded(summary, args):
+    exceeded = []
+    for option, key in THRESHOLDS.items():
+        limit = getattr(args, option)
+        if limit is not None and summary[key] > limit:
+            exceeded.append({"metric": key, "value": summary[key], "limit": limit})
+    return exceeded
+
+
+def analyze_directories(args, out):
+    """Write one JSON line per record for every repo; return the process exit code."""
+    exit_code = EXIT_OK
+    for repo in _repositories(args.paths, args.each):
+        if not os.path.isdir(repo):
+            out.write(json.dumps({"type": "error", "directory": repo, "error": "Not a directory"}) + "\n")
+            exit_code = max(exit_code, EXIT_ERROR)
+            continue
+
+        records = iter_batch_records(
+            "directory", repo,
+            detect_duplicates=args.duplicates,
+            workers=args.workers,
+            file_timeout=args.timeout,
+            triage=build_triage(args.ignore, not args.no_triage),
+        )
+        for record in records:
+            if record["type"] == "file" and args.summary_only:
+                continue
+            record = {**record, "directory": repo}
+            if record["type"] == "summary":
+                record["thresholds_exceeded"] = _exceeded(record["summary"], args)
+                if record["thresholds_exceeded"]:
+                    exit_code = max(exit_code, EXIT_THRESHOLD)
+            elif record["type"] == "error":
+                exit_code = max(exit_code, EXIT_ERROR)
+            out.write(json.dumps(record) + "\n")
+        out.flush()
+    return exit_code
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m batch",
+        description="Analyze local source directories in place and write JSON Lines "
+                    "(one record per file, then a summary record per directory).",
+    )
+    parser.add_argument("paths", nargs="+", help="directories to analyze")
+    parser.add_argument("--each", action="store_true",
+                        help="treat every subdirectory of the given paths as its own repo")
+    parser.add_argument("-o", "--output", help="write JSON Lines here instead of stdout")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="analyze files in this many worker processes")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_FILE_TIMEOUT,
+                        help="per-file time limit in seconds (runs files in worker processes)")
+    parser.add_argument("--duplicates", action="store_true", help="report duplicate / near-duplicate files")
+    parser.add_argument("--ignore", action="append", default=[], metavar="GLOB", help="extra ignore pattern")
+    parser.add_argument("--no-triage", action="store_true",
+                        help="analyze vendored, generated and minified files too")
+    parser.add_argument("--summary-only", action="store_true", help="write only the summary records")
+    for option in THRESHOLDS:
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, type=int, metavar="N",
+                            help=f"exit with {EXIT_THRESHOLD} if a repo's {THRESHOLDS[option]} exceeds N")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            return analyze_directories(args, out)
+    return analyze_directories(args, sys.stdout)
@@ -0,0 +1,78 @@
+import hashlib
+from itertools import combinations
+from typing import Any, Dict, List, Tuple
+
+from plagiarism.fingerprint import build_fingerprint_index, count_shared_fingerprints, fingerprint_tokens
+from plagiarism.tokens import token_stream
+
+# Fingerprints shared by more files than this are boilerplate (license
+# headers, generated stubs) and would otherwise link unrelated files.
+MAX_DOC_FREQUENCY = 50
+
+
+def file_signature(code: str, language: str) -> Dict[str, Any]:
+    """Content hash plus winnowed fingerprints of one file's token stream."""
+    return {
+        "sha256": hashlib.sha256(code.encode("utf-8", errors="ignore")).hexdigest(),
+        "fingerprints": fingerprint_tokens(token_stream(code, language)[0]),
+    }
+
+
+def find_duplicate_clusters(signatures: Dict[str, Dict[str, Any]], threshold: float = 0.8) -> List[Dict[str, Any]]:
+    """
+    Group files that are exact copies (same content hash) or near-duplicates
+    (fingerprint Jaccard >= threshold). Candidate pairs come from the inverted
+    fingerprint index, so only files that share fingerprints are compared.
+    Clusters are complete-linkage: every two files in a cluster are copies or
+    near-duplicates of each other, so a chain of pairwise-similar files never
+    pulls unrelated ones together.
+    """
+    # Exact copies collapse to their first path; similarity is computed once
+    # per distinct content
+    copies: Dict[str, List[str]] = {}
+    for path in sorted(signatures):
+        copies.setdefault(signatures[path]["sha256"], []).append(path)
+    representatives = {paths[0]: paths for paths in copies.values()}
+
+    fingerprints = {
+        path: signatures[path]["fingerprints"]
+        for path in representatives if signatures[path]["fingerprints"]
+    }
+    shared = count_shared_fingerprints(build_fingerprint_index(fingerprints), MAX_DOC_FREQUENCY)
+    similar: Dict[Tuple[str, str], float] = {}
+    for (a, b), count in shared.items():
+        similarity = count / (len(fingerprints[a]) + len(fingerprints[b]) - count)
+        if similarity >= threshold:
+            similar[tuple(sorted((a, b)))] = similarity
+
+    # Agglomerate, most similar pairs first; two clusters merge only if every
+    # cross pair is similar
+    cluster_of = {path: [path] for path in representatives}
+    for (a, b), _ in sorted(similar.items(), key=lambda item: (-item[1], item[0])):
+        first, second = cluster_of[a], cluster_of[b]
+        if first is second:
+            continue
+        if all(tuple(sorted((x, y))) in similar for x in first for y in second):
+            first.extend(second)
+            for path in second:
+                cluster_of[path] = first
+
+    report = []
+    seen = set()
+    for members in cluster_of.values():
+        if id(members) in seen:
+            continue
+        seen.add(id(members))
+        files = sorted(path for rep in members for path in representatives[rep])
+        if len(files) < 2:
+            continue
+        pairs = [similar[tuple(sorted((x, y)))] for x, y in combinations(members, 2)]
+        exact = len(members) == 1
+        report.append({
+            "files": files,
+            "exact": exact,
+            "max_similarity": f"{(1.0 if len(files) > len(members) else max(pairs)) * 100:.2f}%",
+            "min_similarity": f"{(min(pairs) if pairs else 1.0) * 100:.2f}%",
+        })
+    report.sort(key=lambda c: (-len(c["files"]), c["files"][0]))
+    return report
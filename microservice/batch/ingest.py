@@ -0,0 +1,174 @@
+import os
+import tarfile
+import zipfile
+
+from batch.triage import MAX_GITIGNORE_BYTES
+from utils.file_utils import is_allowed, detect_language
+
+# Size caps, overridable through the environment
+MAX_FILE_BYTES = int(os.environ.get("BATCH_MAX_FILE_BYTES", str(1024 * 1024)))
+MAX_TOTAL_BYTES = int(os.environ.get("BATCH_MAX_TOTAL_BYTES", str(200 * 1024 * 1024)))
+
+
+class ArchiveTooLarge(ValueError):
+    """The archive's supported sources exceed the total size cap."""
+
+
+def _read_capped(stream, limit):
+    """Read at most limit + 1 bytes, so oversize members are detected even if their header lies."""
+    data = stream.read(limit + 1)
+    return data if len(data) <= limit else None
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def iter_archive_files(source, skipped=None, max_file_bytes=MAX_FILE_BYTES, max_total_bytes=MAX_TOTAL_BYTES,
+                       triage=None):
+    """
+    Stream supported source files straight out of a zip or tar(.gz) archive
+    without extracting it. Members are filtered by name (SUPPORTED_EXTENSIONS
+    and the triage path rules) before anything is decompressed, so images,
+    binaries, node_modules and the like cost nothing. A non-archive upload is
+    treated as a single source file.
+
+    Yields (path, language, code). Files over max_file_bytes or rejected by
+    `triage` (batch.triage.Triage) are left out and appended to `skipped` as
+    {"path", "reason", "category"}; going over max_total_bytes raises
+    ArchiveTooLarge. Zip .gitignore files are read up front; in a tar stream
+    they only apply to members that come after them.
+    """
+    skipped = [] if skipped is None else skipped
+    total = 0
+
+    def wanted(name):
+        if not is_allowed(name):
+            return False
+        record = triage.check_path(name) if triage else None
+        if record:
+            skipped.append(record)
+        return record is None
+
+    def accept(name, data):
+        nonlocal total
+        if data is None:
+            skipped.append({"path": name, "reason": f"larger than {max_file_bytes} bytes", "category": "too_large"})
+            return None
+        total += len(data)
+        if total > max_total_bytes:
+            raise ArchiveTooLarge(f"Archive sources exceed {max_total_bytes} bytes")
+        code = data.decode("utf-8", errors="ignore")
+        record = triage.check_content(name, code) if triage else None
+        if record:
+            skipped.append(record)
+            return None
+        return code
+
+    _rewind(source)
+    if zipfile.is_zipfile(source):
+        _rewind(source)
+        with zipfile.ZipFile(source, "r") as zf:
+            if triage:
+                for info in zf.infolist():
+                    if triage.is_gitignore(info.filename) and info.file_size <= MAX_GITIGNORE_BYTES:
+                        triage.add_gitignore(info.filename, zf.read(info).decode("utf-8", errors="ignore"))
+            for info in zf.infolist():
+                if info.is_dir() or not wanted(info.filename):
+                    continue
+                if info.file_size > max_file_bytes:
+                    accept(info.filename, None)
+                    continue
+                with zf.open(info) as member:
+                    code = accept(info.filename, _read_capped(member, max_file_bytes))
+                if code is not None:
+                    yield info.filename, detect_language(info.filename), code
+        return
+
+    _rewind(source)
+    try:
+        tar = tarfile.open(fileobj=source, mode="r|*") if hasattr(source, "read") else tarfile.open(source, "r|*")
+    except tarfile.TarError:
+        tar = None
+    if tar is not None:
+        with tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                if triage and triage.is_gitignore(member.name) and member.size <= MAX_GITIGNORE_BYTES:
+                    triage.add_gitignore(member.name, tar.extractfile(member).read().decode("utf-8", errors="ignore"))
+                    continue
+                if not wanted(member.name):
+                    continue
+                if member.size > max_file_bytes:
+                    accept(member.name, None)
+                    continue
+                code = accept(member.name, _read_capped(tar.extractfile(member), max_file_bytes))
+                if code is not None:
+                    yield member.name, detect_language(member.name), code
+        return
+
+    # Plain single-file upload
+    _rewind(source)
+    name = os.path.basename(getattr(source, "filename", None) or getattr(source, "name", None) or str(source))
+    if not wanted(name):
+        return
+    if hasattr(source, "read"):
+        data = _read_capped(source, max_file_bytes)
+    else:
+        with open(source, "rb") as f:
+            data = _read_capped(f, max_file_bytes)
+    code = accept(name, data)
+    if code is not None:
+        yield name, detect_language(name), code
+
+
+def iter_directory_files(root, skipped=None, max_file_bytes=MAX_FILE_BYTES, triage=None):
+    """
+    Walk a local checkout in place and yield (relpath, language, code) like
+    iter_archive_files, with the same size cap and triage. Vendored directories
+    are pruned from the walk with one skipped record each (not one per file),
+    and each directory's .gitignore is read before anything below it, so
+    nested rules behave as in git.
+    """
+    skipped = [] if skipped is None else skipped
+    root = os.path.abspath(root)
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        reldir = os.path.relpath(dirpath, root).replace(os.sep, "/")
+        reldir = "" if reldir == "." else reldir
+        if triage:
+            if ".gitignore" in filenames:
+                gitignore = os.path.join(dirpath, ".gitignore")
+                if os.path.getsize(gitignore) <= MAX_GITIGNORE_BYTES:
+                    with open(gitignore, "r", encoding="utf-8", errors="ignore") as f:
+                        triage.add_gitignore(f"{reldir}/.gitignore" if reldir else ".gitignore", f.read())
+            for d in sorted(d for d in dirnames if d in triage.vendored):
+                path = f"{reldir}/{d}" if reldir else d
+                skipped.append({"path": path, "reason": f"vendored directory '{d}'", "category": "vendored"})
+            dirnames[:] = [d for d in dirnames if d not in triage.vendored]
+        dirnames.sort()
+
+        for name in sorted(filenames):
+            relpath = f"{reldir}/{name}" if reldir else name
+            if not is_allowed(name):
+                continue
+            record = triage.check_path(relpath) if triage else None
+            if record:
+                skipped.append(record)
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path) or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                data = _read_capped(f, max_file_bytes)
+            if data is None:
+                skipped.append({"path": relpath, "reason": f"larger than {max_file_bytes} bytes", "category": "too_large"})
+                continue
+            code = data.decode("utf-8", errors="ignore")
+            record = triage.check_content(relpath, code) if triage else None
+            if record:
+                skipped.append(record)
+                continue
+            yield relpath, detect_language(name), code
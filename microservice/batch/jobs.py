@@ -0,0 +1,400 @@
+import argparse
+import atexit
+import json
+import multiprocessing as mp
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from batch.ingest import ArchiveTooLarge, iter_archive_files
+from batch.triage import build_triage
+from batch.processor import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_WORKERS,
+    _analyze_entries,
+    _java_sources,
+    build_report,
+    duplicate_report,
+    file_entry,
+)
+from utils.github_fetcher import FetchError, fetch_repo_archive
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_JOBS_PATH = os.environ.get("BATCH_JOBS_PATH", os.path.join(DATA_DIR, "jobs.db"))
+DEFAULT_JOB_WORKERS = int(os.environ.get("BATCH_JOB_WORKERS", "1"))
+# A job whose worker died this many times (e.g. OOM-killed) is failed, not requeued again
+MAX_JOB_ATTEMPTS = int(os.environ.get("BATCH_JOB_ATTEMPTS", "3"))
+POLL_INTERVAL = 1.0
+
+# Same reasoning as batch.parallel: fork is cheap once the analyzers are imported
+_CTX = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    archive_path TEXT,
+    options TEXT NOT NULL,
+    files_total INTEGER,
+    skipped TEXT,
+    error TEXT,
+    report TEXT,
+    worker_pid INTEGER,
+    worker_token TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+# Columns added since the first schema, for existing databases
+_ADDED_COLUMNS = {"worker_token": "TEXT", "attempts": "INTEGER NOT NULL DEFAULT 0"}
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _process_token(pid):
+    """
+    "boot id:pid:start time" of a live process, None if it is gone. A reused
+    pid (e.g. after a container restart) gets a different token. Without
+    /proc the token is the bare pid.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Field 22 is the start time; the command name before it may contain spaces
+            start_time = f.read().rsplit(")", 1)[1].split()[19]
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        if os.path.isdir("/proc"):
+            return None  # /proc is there, the process is not
+        return str(pid) if _pid_alive(pid) else None
+    return f"{boot_id}:{pid}:{start_time}"
+
+
+def _worker_alive(pid, token):
+    if not pid:
+        return False
+    if token is None:
+        return _pid_alive(pid)  # claimed before tokens were stored
+    return _process_token(pid) == token
+
+
+class JobQueue:
+    """
+    Durable batch job queue in SQLite. Every analyzed file is committed as it
+    finishes, so a job interrupted by a restart resumes at the first file
+    without a stored result instead of starting over.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        self.archive_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "jobs")
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self._workers = []
+        self._workers_pid = None
+        self._workers_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    # ----------------------------
+    # Submission
+    # ----------------------------
+    def submit_upload(self, upload, options: Optional[Dict[str, Any]] = None) -> str:
+        """Queue an uploaded archive; it is saved under data/jobs/ so workers can reopen it."""
+        job_id = uuid.uuid4().hex
+        archive_path = os.path.join(self.archive_dir, job_id + ".upload")
+        if hasattr(upload, "save"):
+            upload.save(archive_path)
+        else:
+            with open(archive_path, "wb") as f:
+                f.write(upload.read())
+        origin = getattr(upload, "filename", None) or "upload"
+        return self._insert(job_id, "upload", origin, archive_path, options)
+
+    def submit_github(self, repo_url: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """Queue a GitHub repo; the worker downloads it, so submitting never blocks."""
+        return self._insert(uuid.uuid4().hex, "github", repo_url, None, options)
+
+    def _insert(self, job_id, source, origin, archive_path, options):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, source, origin, archive_path, options, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, source, origin, archive_path, json.dumps(options or {}), _now()),
+            )
+        return job_id
+
+    # ----------------------------
+    # Progress / results
+    # ----------------------------
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            done = conn.execute("SELECT COUNT(*) FROM job_files WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+        total = row["files_total"]
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "source": row["source"],
+            "origin": row["origin"],
+            "progress": {
+                "files_done": done,
+                "files_total": total,
+                "percent": round(done / total * 100, 2) if total else (100.0 if row["status"] == "done" else 0.0),
+            },
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def files(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Per-file results stored so far, in report order."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT result FROM job_files WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+        return [json.loads(r["result"]) for r in rows]
+
+    def report(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT report FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["report"]) if row and row["report"] else None
+
+    # ----------------------------
+    # Worker side
+    # ----------------------------
+    def requeue_orphans(self) -> int:
+        """
+        Put 'running' jobs whose worker process is gone back in the queue, or
+        fail them once they have used MAX_JOB_ATTEMPTS workers.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, worker_pid, worker_token, attempts FROM jobs WHERE status = 'running'"
+            ).fetchall()
+            orphans = [r for r in rows if not _worker_alive(r["worker_pid"], r["worker_token"])]
+            for r in orphans:
+                if r["attempts"] >= MAX_JOB_ATTEMPTS:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, worker_pid = NULL, "
+                        "worker_token = NULL WHERE id = ? AND status = 'running'",
+                        (f"worker died {r['attempts']} times running this job", _now(), r["id"]),
+                    )
+                else:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker_pid = NULL, worker_token = NULL "
+                        "WHERE id = ? AND status = 'running'",
+                        (r["id"],),
+                    )
+        return len(orphans)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, worker_token = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (os.getpid(), _process_token(os.getpid()), _now(), row["id"]),
+            )
+            conn.execute("COMMIT")
+        return dict(row)
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def run(self, job: Dict[str, Any]) -> None:
+        """Analyze one claimed job, skipping files already stored by an earlier attempt."""
+        job_id = job["id"]
+        options = json.loads(job["options"])
+        workers = options.get("workers") or DEFAULT_WORKERS
+        file_timeout = options.get("file_timeout") or DEFAULT_FILE_TIMEOUT
+
+        archive_path = job["archive_path"]
+        if not archive_path or not os.path.exists(archive_path):
+            try:
+                cached = fetch_repo_archive(job["origin"])
+            except FetchError as e:
+                self._update(job_id, status="failed", error=str(e), finished_at=_now())
+                return
+            # Pin the job to this snapshot: stored results are by file index,
+            # and a later fetch may replace the cached archive.
+            archive_path = os.path.join(self.archive_dir, job_id + ".zip")
+            try:
+                os.link(cached, archive_path)
+            except OSError:
+                shutil.copyfile(cached, archive_path)
+            self._update(job_id, archive_path=archive_path)
+
+        try:
+            self._run_archive(job, options, archive_path, workers, file_timeout)
+        except Exception:
+            # The job is marked failed and will not resume: drop its snapshot
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            raise
+
+    def _run_archive(self, job, options, archive_path, workers, file_timeout):
+        job_id = job["id"]
+        skipped = []
+        try:
+            with open(archive_path, "rb") as f:
+                triage = build_triage(options.get("ignore", []), options.get("triage", True))
+                entries = sorted(iter_archive_files(f, skipped, triage=triage))
+        except ArchiveTooLarge as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=_now())
+            os.remove(archive_path)
+            return
+        self._update(job_id, files_total=len(entries), skipped=json.dumps(skipped))
+
+        with self._connect() as conn:
+            done = {r[0] for r in conn.execute("SELECT idx FROM job_files WHERE job_id = ?", (job_id,))}
+        todo = [i for i in range(len(entries)) if i not in done]
+
+        outcomes = _analyze_entries([entries[i] for i in todo], workers, file_timeout, _java_sources(entries))
+        for i, (relpath, language, status, outcome) in zip(todo, outcomes):
+            result = file_entry(relpath, language, status, outcome, file_timeout)
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_files (job_id, idx, result) VALUES (?, ?, ?)",
+                    (job_id, i, json.dumps(result)),
+                )
+
+        duplicates = None
+        if options.get("detect_duplicates"):
+            duplicates = duplicate_report(entries, options.get("duplicate_threshold", 0.8))
+        report = build_report(job["source"], job["origin"], self.files(job_id, limit=-1), skipped, duplicates)
+        self._update(job_id, status="done", report=json.dumps(report), finished_at=_now())
+        os.remove(archive_path)
+
+    def work(self, stop_when_idle: bool = False) -> None:
+        """Worker loop: claim and run jobs until the process is stopped."""
+        while True:
+            job = self.claim()
+            if job is None:
+                if stop_when_idle:
+                    return
+                time.sleep(POLL_INTERVAL)
+                continue
+            try:
+                self.run(job)
+            except Exception as e:
+                self._update(job["id"], status="failed", error=str(e), finished_at=_now())
+
+    def start_workers(self, count: int = DEFAULT_JOB_WORKERS) -> None:
+        """
+        Start local worker processes (once per service process; safe to call
+        from several threads). Jobs left 'running' by a previous service
+        instance are requeued first. Later calls replace workers that died
+        (e.g. OOM-killed) and requeue their jobs, so call this regularly.
+        """
+        with self._workers_lock:
+            # A forked copy of the queue (e.g. a pre-forking server) starts its own set
+            if self._workers_pid == os.getpid():
+                dead = [proc for proc in self._workers if not proc.is_alive()]
+                if not dead:
+                    return
+                self._workers = [proc for proc in self._workers if proc not in dead]
+                self.requeue_orphans()
+                for _ in dead:
+                    self._spawn_worker()
+                return
+            self._workers, self._workers_pid = [], os.getpid()
+            self.requeue_orphans()
+            for _ in range(count):
+                self._spawn_worker()
+            atexit.register(self.stop_workers)
+
+    def _spawn_worker(self):
+        # Not daemonic: workers spawn their own per-file processes (batch.parallel)
+        proc = _CTX.Process(target=self.work, name="batch-job-worker")
+        proc.start()
+        self._workers.append(proc)
+
+    def stop_workers(self) -> None:
+        # The current job stays 'running' and is resumed by the next start_workers()
+        with self._workers_lock:
+            if self._workers_pid != os.getpid():
+                return
+            for proc in self._workers:
+                proc.terminate()
+            for proc in self._workers:
+                proc.join()
+            self._workers, self._workers_pid = [], None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run batch job workers outside the web service.")
+    parser.add_argument("--db", default=DEFAULT_JOBS_PATH, help="path to the job queue database")
+    parser.add_argument("--workers", type=int, default=DEFAULT_JOB_WORKERS)
+    parser.add_argument("--once", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    queue.requeue_orphans()
+    if args.once:
+        queue.work(stop_when_idle=True)
+        return
+    queue.start_workers(args.workers)
+    for proc in queue._workers:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
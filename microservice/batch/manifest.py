@@ -0,0 +1,77 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Tuple
+
+DEFAULT_MANIFEST_PATH = os.environ.get(
+    "BATCH_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "manifests.db"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS manifest_files (
+    repo TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_key TEXT NOT NULL,
+    report TEXT NOT NULL,
+    PRIMARY KEY (repo, path)
+) WITHOUT ROWID;
+"""
+
+def repo_key(source_type: str, origin: str) -> str:
+    """Stable manifest name for a batch source (GitHub URLs are normalized)."""
+    origin = str(origin).strip().rstrip("/")
+    if source_type == "github":
+        origin = origin.lower()
+        if origin.endswith(".git"):
+            origin = origin[:-4]
+    return f"{source_type}:{origin}"
+
+
+class ManifestStore:
+    """
+    Per-repo manifests of path -> content key -> stored file report.
+    The content key covers the code and the analyzer/toolchain versions
+    (analysis.cache.cache_key, with a Java file's compile unit as context), so
+    upgrading a tool re-analyzes every file.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def load(self, repo: str) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT path, content_key, report FROM manifest_files WHERE repo = ?", (repo,)
+            ).fetchall()
+        return {path: (key, json.loads(report)) for path, key, report in rows}
+
+    def update(self, repo: str, changed: Dict[str, Tuple[str, Dict[str, Any]]], removed: Iterable[str]) -> None:
+        """Store new / changed file reports and drop deleted paths in one transaction."""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO manifest_files (repo, path, content_key, report) VALUES (?, ?, ?, ?)",
+                ((repo, path, key, json.dumps(report)) for path, (key, report) in changed.items()),
+            )
+            conn.executemany(
+                "DELETE FROM manifest_files WHERE repo = ? AND path = ?",
+                ((repo, path) for path in removed),
+            )
+
+    def forget(self, repo: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM manifest_files WHERE repo = ?", (repo,)).rowcount
@@ -0,0 +1,108 @@
+import multiprocessing as mp
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from analysis import tool_runner
+
+# fork keeps worker start-up cheap (analyzers are already imported);
+# fall back to the platform default where fork is unavailable.
+_CTX = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+# How long a stopped worker gets to kill its tools before SIGKILL
+KILL_GRACE_SECONDS = 1.0
+
+
+def _terminate(signum, frame):
+    tool_runner.kill_running()
+    os._exit(1)
+
+
+def _worker(conn, func, args):
+    # Own process group, so a timeout also kills the linters/compilers it spawned;
+    # tool_runner's tools run in sessions of their own and are killed on SIGTERM
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        conn.send(("ok", func(*args)))
+    except BaseException as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+def _kill(proc):
+    # SIGTERM first: the worker kills its tools (see _terminate), then the group goes
+    proc.terminate()
+    proc.join(KILL_GRACE_SECONDS)
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass  # group not created yet; the kill below still stops the worker
+    proc.kill()
+    proc.join()
+
+
+def map_with_timeouts(func: Callable, items: Iterable[Tuple], workers: int,
+                      timeout: Optional[float] = None) -> Iterator[Tuple[int, str, Any]]:
+    """
+    Run func(*args) for every args tuple with at most `workers` child processes
+    at once, each getting a fresh forked process and a hard wall-clock deadline.
+    Yields (index, status, value) strictly in input order, where status is
+    "ok" (value = result), "error" (value = message) or "timeout" (value = None).
+    """
+    pending = enumerate(items)
+    running = {}   # connection -> (index, process, deadline)
+    finished = {}
+    next_index = 0
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(running) < workers:
+                item = next(pending, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, args = item
+                recv_conn, send_conn = _CTX.Pipe(duplex=False)
+                proc = _CTX.Process(target=_worker, args=(send_conn, func, args), daemon=True)
+                proc.start()
+                send_conn.close()
+                running[recv_conn] = (index, proc, time.monotonic() + timeout if timeout else None)
+
+            if not running:
+                break
+
+            deadlines = [d for _, _, d in running.values() if d is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+
+            for conn in wait(list(running), timeout=wait_for):
+                index, proc, _ = running.pop(conn)
+                try:
+                    finished[index] = conn.recv()
+                except EOFError:
+                    proc.join()
+                    finished[index] = ("error", f"Worker exited with code {proc.exitcode}")
+                conn.close()
+                proc.join()
+
+            now = time.monotonic()
+            for conn, (index, proc, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    _kill(proc)
+                    conn.close()
+                    del running[conn]
+                    finished[index] = ("timeout", None)
+
+            while next_index in finished:
+                status, value = finished.pop(next_index)
+                yield next_index, status, value
+                next_index += 1
+    finally:
+        for conn, (_, proc, _) in running.items():
+            _kill(proc)
+            conn.close()
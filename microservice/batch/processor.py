@@ -1,11 +1,17 @@
+import asyncio
 import os
-import tempfile
-import shutil
-import zipfile
-import requests
+import subprocess
 from datetime import datetime
 
-from utils.file_utils import is_allowed, detect_language
+from batch.duplicates import file_signature, find_duplicate_clusters
+from batch.ingest import ArchiveTooLarge, iter_archive_files, iter_directory_files
+from batch.manifest import repo_key
+from batch.parallel import map_with_timeouts
+from batch.triage import Triage
+from utils.github_fetcher import FetchError, fetch_repo_archive
+from analysis import pylint_runner, tool_runner
+from analysis.tool_runner import ToolError
+from analysis.cache import analysis_cache, cache_key, toolchain_version
 from analysis.python_analyzer import analyze_python
 from analysis.javascript_analyzer import analyze_javascript
 from analysis.c_cpp_analyzer import analyze_c_cpp
@@ -13,17 +19,32 @@ from analysis.java_analyzer import analyze_java
 from analysis.error_checker import (
     check_python_errors,
     check_javascript_errors,
+    check_javascript_batch,
     check_c_cpp_errors,
-    check_java_errors
+    check_c_cpp_batch,
+    check_java_errors,
+    check_java_batch,
+    java_compile_units,
+    java_unit_contexts,
+    python_syntax_errors
 )
 
+# Process-pool settings for the batch walk (1 worker and no timeout = in-process)
+DEFAULT_WORKERS = int(os.environ.get("BATCH_WORKERS", "1"))
+DEFAULT_FILE_TIMEOUT = float(os.environ.get("BATCH_FILE_TIMEOUT", "0")) or None
+# Files per batched lint pass (pylint, ESLint, cppcheck + compiler, javac + SpotBugs) in batch mode
+PRELINT_CHUNK = int(os.environ.get("BATCH_PRELINT_CHUNK", "64"))
+
 def analyze_file(path, language):
     """Analyze a single file: metrics + syntax + logic issues."""
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         code = f.read()
+    return analyze_code(code, language)
+
 
+def _base_result(code):
     # Default metrics
-    base_result = {
+    return {
         "metrics": {
             "lines_of_code": len(code.splitlines()),
             "functions": 0,
@@ -40,144 +61,461 @@ def analyze_file(path, language):
         "logic_issues": []
     }
 
+
+def _run_analyzers(code, language, lint=None):
+    # Run existing analyzer (lint: results of a batched lint pass, see _prelinted)
+    if language == "python":
+        result = analyze_python(code)
+    elif language == "javascript":
+        result = analyze_javascript(code)
+    elif language in ["c", "cpp"]:
+        result = analyze_c_cpp(code, language)
+    elif language == "java":
+        result = analyze_java(code)
+    else:
+        result = _base_result(code)
+
     try:
-        # Run existing analyzer
+        if isinstance(lint, ToolError):
+            raise lint  # the batched lint pass failed for a file it cannot be re-run without
         if language == "python":
-            result = analyze_python(code)
-            se, le = check_python_errors(code)
+            se, le = check_python_errors(code, lint)
         elif language == "javascript":
-            result = analyze_javascript(code)
-            se, le = check_javascript_errors(code)
+            se, le = lint if lint is not None else check_javascript_errors(code)
         elif language in ["c", "cpp"]:
-            result = analyze_c_cpp(code, language)
-            se, le = check_c_cpp_errors(code, language)
+            se, le = lint if lint is not None else check_c_cpp_errors(code, language)
         elif language == "java":
-            result = analyze_java(code)
-            se, le = check_java_errors(code)
+            se, le = lint if lint is not None else check_java_errors(code)
+        else:
+            se, le = [], []
+    except (ToolError, subprocess.TimeoutExpired) as e:
+        # Keep the metrics and what the other tools found; the failure is
+        # reported and the result is not cached
+        result["tool_errors"] = [str(e)]
+        partial = getattr(e, "result", None)
+        if partial is not None:
+            se, le = partial[0], [*partial[1], str(e)]
         else:
-            result, se, le = base_result, [], []
+            se = python_syntax_errors(code) if language == "python" else []
+            le = [str(e)]
 
-        # Merge results with error checks
-        result.setdefault("syntax_errors", []).extend(se)
-        result.setdefault("logic_issues", []).extend(le)
-        return result
+    # Merge results with error checks
+    result.setdefault("syntax_errors", []).extend(se)
+    result.setdefault("logic_issues", []).extend(le)
+    return result
 
+
+def analyze_code(code, language, lint=None, context=""):
+    """
+    Analyze source already in memory: metrics + syntax + logic issues.
+    Results are cached by content and context (see analysis.cache); failures,
+    including results with tool_errors, are not cached.
+    """
+    try:
+        return analysis_cache.cached("batch", code, language, lambda: _run_analyzers(code, language, lint), context)
     except Exception as e:
-        return {**base_result, "syntax_errors": [str(e)]}
+        return {**_base_result(code), "syntax_errors": [str(e)]}
 
 
-def process_batch(source_type, source_value):
-    """Process a batch (GitHub repo or uploaded ZIP)."""
-    tmpdir = tempfile.mkdtemp(prefix="batch_")
+def _pool_analyze(code, language, lint=None, context=""):
+    """
+    analyze_code for pool workers. Workers see the cache as of their fork but
+    cannot update the parent's, so fresh results come back with their key.
+    """
+    key = cache_key("batch", code, language, context)
+    result = analysis_cache.get(key)
+    if result is not None:
+        return result, None
     try:
-        # --- 1. Fetch or extract repo ---
-        if source_type == "github":
-            url = source_value.rstrip("/")
-            if url.endswith(".git"):
-                url = url[:-4]
-            zip_url = url + "/archive/refs/heads/main.zip"
-            r = requests.get(zip_url, timeout=20)
-            if r.status_code != 200:
-                zip_url = url + "/archive/refs/heads/master.zip"
-                r = requests.get(zip_url, timeout=20)
-            if r.status_code != 200:
-                return {"error": "Failed to fetch GitHub repo"}, 400
-
-            zpath = os.path.join(tmpdir, "repo.zip")
-            with open(zpath, "wb") as f:
-                f.write(r.content)
-            with zipfile.ZipFile(zpath, "r") as zf:
-                zf.extractall(tmpdir)
-
-        elif source_type == "upload":
-            if zipfile.is_zipfile(source_value):
-                with zipfile.ZipFile(source_value, "r") as zf:
-                    zf.extractall(tmpdir)
-            else:
-                shutil.copy(source_value, tmpdir)
-
-        # --- 2. Prepare reports ---
-        files_report = []
-        summary = {
-            "total_loc": 0,
-            "total_files": 0,
-            "files_with_errors": 0,
-            "total_cyclomatic_complexity": 0,
-            "total_functions": 0,
-            "total_loops": 0,
-            "syntax_errors_found": 0,
-            "logic_issues_found": 0
-        }
-        languages = set()
-        all_suggestions = []
-
-        # Keys to safely accumulate
-        numeric_keys = {
-            "lines_of_code": "total_loc",
-            "cyclomatic_complexity": "total_cyclomatic_complexity",
-            "functions": "total_functions",
-            "loops": "total_loops"
+        return _run_analyzers(code, language, lint), key
+    except Exception as e:
+        return {**_base_result(code), "syntax_errors": [str(e)]}, None
+
+
+def _chunks(entries):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= PRELINT_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _java_sources(entries):
+    return {relpath: code for relpath, language, code in entries if language == "java"}
+
+
+def _prelinted(entries, java_sources=None):
+    """
+    Yield entries as (relpath, language, code, lint, context). The files of
+    every PRELINT_CHUNK entries that are not already cached are linted
+    together: Python by the warm pylint workers (lint = pylint messages),
+    JavaScript by one ESLint run, C/C++ by one cppcheck and compiler pass, Java
+    by javac per compile unit and SpotBugs (all three lint = (syntax_errors,
+    logic_issues)). lint is None when a file was not prelinted; its checker
+    then runs on it alone. Each batched run is bounded by its tool's timeout,
+    scaled by file count.
+    A Java file is compiled against the other files of its compile unit (see
+    error_checker.java_compile_units) among java_sources, every Java file of
+    the batch, or those read so far when entries are a stream; context is the
+    unit's digest, part of the file's cache key.
+    """
+    java_sources = dict(java_sources or {})
+    parsed = {}
+    for chunk in _chunks(entries):
+        yield from _lint_chunk(chunk, java_sources, parsed)
+
+
+def _lint_chunk(chunk, java_sources, parsed):
+    contexts = {}
+    if any(language == "java" for _, language, _ in chunk):
+        java_sources.update(_java_sources(chunk))
+        contexts = java_unit_contexts(java_sources, parsed)
+
+    python, javascript, native, java = {}, {}, {}, {}
+    for i, (relpath, language, code) in enumerate(chunk):
+        if cache_key("batch", code, language, contexts.get(relpath, "")) in analysis_cache:
+            continue
+        if language == "python":
+            python[str(i)] = code
+        elif language == "javascript":
+            javascript[str(i)] = code
+        elif language == "java":
+            java[str(i)] = (relpath, code)
+        elif language in ("c", "cpp"):
+            native[str(i)] = (code, language)
+
+    def check_java(files):
+        # The other files of the checked files' units, cached or not, are visible to javac
+        units = java_compile_units(java_sources, parsed)
+        checked = {relpath for relpath, _ in files.values()}
+        roots = {units[relpath][0] for relpath in checked}
+        siblings = {
+            relpath: code for relpath, code in java_sources.items()
+            if units[relpath][0] in roots and relpath not in checked
         }
+        return check_java_batch(files, siblings)
+
+    batches = [
+        (run, files) for run, files in (
+            (pylint_runner.lint_many, python),
+            (check_javascript_batch, javascript),
+            (check_c_cpp_batch, native),
+            (check_java, java),
+        ) if files
+    ]
+    # The languages' tools run side by side, within tool_runner's slots
+    lint = {}
+    for (run, files), outcome in zip(batches, tool_runner.run_all([asyncio.to_thread(run, files) for run, files in batches])):
+        if not isinstance(outcome, BaseException):
+            lint.update(outcome)
+        elif run is check_java:
+            # A Java file checked alone would miss its unit: report the failure, uncached
+            failure = outcome if isinstance(outcome, ToolError) else ToolError(f"javac error: {outcome}")
+            lint.update((name, failure) for name in files)
+        # other failed batches fall back to per-file runs
+    for i, (relpath, language, code) in enumerate(chunk):
+        yield relpath, language, code, lint.get(str(i)), contexts.get(relpath, "")
+
+
+def _analyze_entries(entries, workers, file_timeout, java_sources=None):
+    """
+    Yield (relpath, language, status, metrics-or-message) per entry, in entry order.
+    entries may be a lazy iterator; it is consumed only as fast as files are analyzed.
+    java_sources ({relpath: code}) holds every Java file of the batch when
+    entries are only some of them (see _prelinted).
+    Runs in-process unless a worker count > 1 or a per-file timeout is set,
+    in which case files are analyzed in child processes (see batch.parallel).
+    """
+    if workers <= 1 and not file_timeout:
+        for relpath, language, code, lint, context in _prelinted(entries, java_sources):
+            try:
+                yield relpath, language, "ok", analyze_code(code, language, lint, context)
+            except Exception as e:
+                yield relpath, language, "error", str(e)
+        return
+
+    # Chunk by chunk: a chunk is linted while none of its files' workers are
+    # running, so the lint pass never holds up their deadline enforcement
+    # (and the per-file timeout covers analysis only, not the batched lint)
+    java_sources, parsed = dict(java_sources or {}), {}
+    for chunk in _chunks(entries):
+        linted = list(_lint_chunk(chunk, java_sources, parsed))
+        for _, language, _, _, _ in linted:
+            toolchain_version(language)  # probe once here; forked workers inherit it
+
+        jobs = ((code, language, lint, context) for _, language, code, lint, context in linted)
+        for index, status, value in map_with_timeouts(_pool_analyze, jobs, max(1, workers), file_timeout):
+            relpath, language = linted[index][:2]
+            if status == "ok":
+                value, key = value
+                if key:
+                    analysis_cache.put(key, value)
+            yield relpath, language, status, value
+
+
+def file_entry(relpath, language, status, outcome, file_timeout=None):
+    """Per-file report entry from an _analyze_entries outcome."""
+    if status == "ok":
+        metrics = outcome
+    elif status == "timeout":
+        metrics = {"metrics": {}, "error": f"Analysis timed out after {file_timeout}s", "timed_out": True}
+    else:
+        metrics = {"metrics": {}, "error": outcome}
+
+    entry = {
+        "path": relpath,
+        "language": language,
+        "metrics": metrics.get("metrics", {}),
+        "syntax_errors": metrics.get("syntax_errors", []),
+        "logic_issues": metrics.get("logic_issues", []),
+        "suggestions": metrics.get("suggestions", [])
+    }
+    if "error" in metrics:
+        entry["error"] = metrics["error"]
+    if metrics.get("tool_errors"):
+        entry["tool_errors"] = metrics["tool_errors"]
+    if metrics.get("timed_out"):
+        entry["timed_out"] = True
+    return entry
+
+
+def empty_summary():
+    return {
+        "total_loc": 0,
+        "total_files": 0,
+        "files_with_errors": 0,
+        "total_cyclomatic_complexity": 0,
+        "total_functions": 0,
+        "total_loops": 0,
+        "syntax_errors_found": 0,
+        "logic_issues_found": 0,
+        "files_timed_out": 0
+    }
+
+
+# Keys to safely accumulate
+NUMERIC_KEYS = {
+    "lines_of_code": "total_loc",
+    "cyclomatic_complexity": "total_cyclomatic_complexity",
+    "functions": "total_functions",
+    "loops": "total_loops"
+}
+
+
+def add_to_summary(summary, entry):
+    """Fold one file entry into the running summary."""
+    syntax_errs = entry["syntax_errors"]
+    logic_errs = entry["logic_issues"]
+
+    if "error" in entry or syntax_errs or logic_errs:
+        summary["files_with_errors"] += 1
+    if entry.get("timed_out"):
+        summary["files_timed_out"] += 1
+    summary["syntax_errors_found"] += len(syntax_errs)
+    summary["logic_issues_found"] += len(logic_errs)
+    summary["total_files"] += 1
 
-        # --- 3. Walk repo ---
-        for root, _, files in os.walk(tmpdir):
-            for fname in files:
-                if not is_allowed(fname):
-                    continue
-                fpath = os.path.join(root, fname)
-                language = detect_language(fname)
-
-                try:
-                    metrics = analyze_file(fpath, language)
-                except Exception as e:
-                    metrics = {"metrics": {}, "error": str(e)}
-                    summary["files_with_errors"] += 1
-
-                syntax_errs = metrics.get("syntax_errors", [])
-                logic_errs = metrics.get("logic_issues", [])
-
-                if syntax_errs or logic_errs:
-                    summary["files_with_errors"] += 1
-                summary["syntax_errors_found"] += len(syntax_errs)
-                summary["logic_issues_found"] += len(logic_errs)
-
-                files_report.append({
-                    "path": os.path.relpath(fpath, tmpdir),
-                    "language": language,
-                    "metrics": metrics.get("metrics", {}),
-                    "syntax_errors": syntax_errs,
-                    "logic_issues": logic_errs,
-                    "suggestions": metrics.get("suggestions", [])
-                })
-
-                summary["total_files"] += 1
-                languages.add(language)
-
-                # --- 4. Accumulate numeric metrics safely ---
-                metrics_data = metrics.get("metrics", {})
-                for key, summary_key in numeric_keys.items():
-                    value = metrics_data.get(key, 0)
-                    if isinstance(value, int):
-                        summary[summary_key] += value
-
-                # --- Collect all suggestions ---
-                if "suggestions" in metrics and isinstance(metrics["suggestions"], list):
-                    all_suggestions.extend(metrics["suggestions"])
-
-        # --- 5. Build final report ---
-        report = {
+    for key, summary_key in NUMERIC_KEYS.items():
+        value = entry["metrics"].get(key, 0)
+        if isinstance(value, int):
+            summary[summary_key] += value
+
+
+def build_report(source_type, origin, files_report, skipped=None, duplicates=None):
+    """Summarize per-file entries into the final batch report."""
+    summary = empty_summary()
+    languages = set()
+    all_suggestions = []
+
+    for entry in files_report:
+        add_to_summary(summary, entry)
+        languages.add(entry["language"])
+
+        # --- Collect all suggestions ---
+        if isinstance(entry["suggestions"], list):
+            all_suggestions.extend(entry["suggestions"])
+
+    report = {
+        "repo": {
+            "source": source_type,
+            "origin": origin,
+            "files_analyzed": summary["total_files"],
+            "languages": sorted(list(languages)),
+        },
+        "files": files_report,
+        "summary": summary,
+        "suggestions_overall": all_suggestions,
+        "skipped": skipped or [],
+        "generated_at": datetime.utcnow().isoformat() + "Z"
+    }
+    if duplicates is not None:
+        report["duplicates"] = duplicates
+    return report
+
+
+def duplicate_report(entries, threshold=0.8):
+    """Duplicate clusters over (relpath, language, code) entries."""
+    signatures = {relpath: file_signature(code, language) for relpath, language, code in entries}
+    return find_duplicate_clusters(signatures, threshold)
+
+
+def _fingerprinting(entries, signatures):
+    """Pass entries through, recording each file's duplicate-detection signature."""
+    for relpath, language, code in entries:
+        signatures[relpath] = file_signature(code, language)
+        yield relpath, language, code
+
+
+def iter_source_files(source_type, source_value, skipped, triage=None):
+    """
+    (relpath, language, code) for a batch source: a GitHub repo, an uploaded
+    archive or a local directory (read in place). Raises FetchError if the
+    GitHub download fails and ArchiveTooLarge past the size cap.
+    """
+    triage = Triage() if triage is None else triage
+    if source_type == "directory":
+        yield from iter_directory_files(source_value, skipped, triage=triage)
+        return
+
+    archive = open(fetch_repo_archive(source_value), "rb") if source_type == "github" else source_value
+    try:
+        yield from iter_archive_files(archive, skipped, triage=triage)
+    finally:
+        if archive is not source_value:
+            archive.close()
+
+
+def _incremental_files(entries, manifest, repo, workers, file_timeout):
+    """
+    Reuse stored reports for files whose content key is unchanged, analyze
+    only added / changed files and drop deleted ones from the manifest.
+    Failed or timed-out files, and files whose tools failed, are not stored,
+    so the next run retries them.
+    """
+    stored = manifest.load(repo)
+    # A Java file's key covers its compile unit, so changing a sibling re-analyzes it
+    java_sources = _java_sources(entries)
+    contexts = java_unit_contexts(java_sources)
+    keys = [cache_key("batch", code, language, contexts.get(relpath, "")) for relpath, language, code in entries]
+    todo = [i for i, (relpath, _, _) in enumerate(entries)
+            if relpath not in stored or stored[relpath][0] != keys[i]]
+
+    files_report = [stored[relpath][1] if relpath in stored else None for relpath, _, _ in entries]
+    changed = {}
+    outcomes = _analyze_entries([entries[i] for i in todo], workers, file_timeout, java_sources)
+    for i, (relpath, language, status, outcome) in zip(todo, outcomes):
+        files_report[i] = file_entry(relpath, language, status, outcome, file_timeout)
+        if status == "ok" and not files_report[i].get("tool_errors"):
+            changed[relpath] = (keys[i], files_report[i])
+
+    present = {relpath for relpath, _, _ in entries}
+    removed = [path for path in stored if path not in present]
+    manifest.update(repo, changed, removed)
+    return files_report, {
+        "manifest": repo,
+        "files_reused": len(entries) - len(todo),
+        "files_analyzed": len(todo),
+        "files_removed": len(removed),
+    }
+
+
+def process_batch(source_type, source_value, detect_duplicates=False, duplicate_threshold=0.8,
+                  workers=None, file_timeout=None, manifest=None, manifest_key=None, triage=None):
+    """
+    Process a batch (GitHub repo, uploaded ZIP or local directory).
+    With detect_duplicates, every file is also fingerprinted and clusters of
+    copied / near-duplicate files are added to the report.
+    workers / file_timeout (defaults: BATCH_WORKERS / BATCH_FILE_TIMEOUT) switch
+    to a process pool where each file gets a hard wall-clock limit.
+    With a manifest (batch.manifest.ManifestStore) the run is incremental:
+    only files changed since the last run of the same repo are analyzed.
+    triage (default: Triage()) drops vendored, generated and minified files
+    before analysis; they are listed under "skipped" with the reason.
+    """
+    workers = DEFAULT_WORKERS if workers is None else workers
+    file_timeout = DEFAULT_FILE_TIMEOUT if file_timeout is None else file_timeout
+
+    # --- 1. Fetch repo / open upload (archives are read in place, never extracted) ---
+    skipped = []
+    try:
+        entries = sorted(iter_source_files(source_type, source_value, skipped, triage))
+    except FetchError as e:
+        return {"error": str(e)}, 400
+    except ArchiveTooLarge as e:
+        return {"error": str(e)}, 413
+
+    origin = getattr(source_value, "filename", source_value)
+
+    # --- 2. Analyze files ---
+    # entries are sorted by path, so sequential and parallel runs report files in the same order
+    incremental = None
+    if manifest is not None:
+        files_report, incremental = _incremental_files(
+            entries, manifest, manifest_key or repo_key(source_type, origin), workers, file_timeout
+        )
+    else:
+        outcomes = _analyze_entries(entries, workers, file_timeout, _java_sources(entries))
+        files_report = [
+            file_entry(relpath, language, status, outcome, file_timeout)
+            for relpath, language, status, outcome in outcomes
+        ]
+
+    # --- 3. Build final report ---
+    duplicates = duplicate_report(entries, duplicate_threshold) if detect_duplicates else None
+    report = build_report(source_type, origin, files_report, skipped, duplicates)
+    if incremental is not None:
+        report["incremental"] = incremental
+    return report, 200
+
+
+def iter_batch_records(source_type, source_value, detect_duplicates=False, duplicate_threshold=0.8,
+                       workers=None, file_timeout=None, triage=None):
+    """
+    Streaming variant of process_batch. Yields one {"type": "file"} record per
+    file as soon as it is analyzed, then a single {"type": "summary"} record
+    (or {"type": "error"}). Archive members are read lazily and nothing but the
+    running summary is kept, so memory stays flat however large the repo is;
+    files come in archive order and suggestions only appear in the file records.
+    """
+    workers = DEFAULT_WORKERS if workers is None else workers
+    file_timeout = DEFAULT_FILE_TIMEOUT if file_timeout is None else file_timeout
+
+    skipped = []
+    signatures = {}
+    summary = empty_summary()
+    languages = set()
+
+    entries = iter_source_files(source_type, source_value, skipped, triage)
+    if detect_duplicates:
+        entries = _fingerprinting(entries, signatures)
+
+    # Any failure ends the stream with an error record, so a client can tell
+    # a broken run from a finished one
+    try:
+        for relpath, language, status, outcome in _analyze_entries(entries, workers, file_timeout):
+            entry = file_entry(relpath, language, status, outcome, file_timeout)
+            add_to_summary(summary, entry)
+            languages.add(language)
+            yield {"type": "file", **entry}
+
+        record = {
+            "type": "summary",
             "repo": {
                 "source": source_type,
-                "origin": source_value,
+                "origin": getattr(source_value, "filename", source_value),
                 "files_analyzed": summary["total_files"],
-                "languages": sorted(list(languages)),
+                "languages": sorted(languages),
             },
-            "files": files_report,
             "summary": summary,
-            "suggestions_overall": all_suggestions,
+            "skipped": skipped,
             "generated_at": datetime.utcnow().isoformat() + "Z"
         }
-
-        return report, 200
-    finally:
-        shutil.rmtree(tmpdir, ignore_errors=True)
+        if detect_duplicates:
+            record["duplicates"] = find_duplicate_clusters(signatures, duplicate_threshold)
+    except Exception as e:
+        yield {"type": "error", "error": str(e)}
+        return
+    yield record
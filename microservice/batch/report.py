@@ -0,0 +1,128 @@
+import gzip
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+COMPACT_FORMAT = "compact-v1"
+ENCODINGS = ["json", "gzip", "msgpack"]
+
+# "Line 12: Missing docstring (...)" -> the message is interned once, the line number stays per file
+_LINE_PREFIX = re.compile(r"^Line (\d+): (.*)$", re.DOTALL)
+
+
+class _StringTable:
+    """
+    Interned values. Messages are strings in practice, but any JSON value is
+    kept as itself (not its JSON text), so expand_report round-trips exactly.
+    """
+
+    def __init__(self):
+        self.strings: List[Any] = []
+        self._index: Dict[Any, int] = {}
+
+    def intern(self, value: Any) -> int:
+        key = value if isinstance(value, str) else (type(value).__name__, json.dumps(value, sort_keys=True))
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def message(self, text):
+        """Index for a message, or [index, line] when it starts with "Line N: "."""
+        if isinstance(text, str):
+            match = _LINE_PREFIX.match(text)
+            if match:
+                return [self.intern(match.group(2)), int(match.group(1))]
+        return self.intern(text)
+
+
+def _counts(counter: Counter) -> List[List[int]]:
+    return [[index, count] for index, count in counter.most_common()]
+
+
+def compact_report(report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Re-encode a batch report with every message interned into one string table.
+    Per-file syntax_errors / logic_issues / suggestions become lists of indexes
+    ([index, line] for "Line N: ..." messages), and suggestions_overall is
+    replaced by [index, count] pairs overall and per language.
+    """
+    table = _StringTable()
+    overall, by_language = Counter(), {}
+
+    files = []
+    for entry in report.get("files", []):
+        compact = {
+            "path": entry["path"],
+            "language": entry["language"],
+            "metrics": entry["metrics"],
+            "syntax_errors": [table.message(m) for m in entry.get("syntax_errors", [])],
+            "logic_issues": [table.message(m) for m in entry.get("logic_issues", [])],
+            "suggestions": [table.intern(s) for s in entry.get("suggestions", [])],
+        }
+        for key in ("error", "timed_out", "tool_errors"):
+            if key in entry:
+                compact[key] = entry[key]
+        files.append(compact)
+
+        language_counts = by_language.setdefault(entry["language"], Counter())
+        for index in compact["suggestions"]:
+            overall[index] += 1
+            language_counts[index] += 1
+
+    result = {key: value for key, value in report.items() if key not in ("files", "suggestions_overall")}
+    result.update({
+        "format": COMPACT_FORMAT,
+        "strings": table.strings,
+        "files": files,
+        "suggestions_overall": _counts(overall),
+        "suggestions_by_language": {language: _counts(c) for language, c in sorted(by_language.items())},
+    })
+    return result
+
+
+def expand_report(compact: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of compact_report: the regular report (suggestions_overall in file order)."""
+    strings = compact["strings"]
+
+    def message(ref):
+        return f"Line {ref[1]}: {strings[ref[0]]}" if isinstance(ref, list) else strings[ref]
+
+    files, suggestions = [], []
+    for entry in compact["files"]:
+        expanded = {
+            **entry,
+            "syntax_errors": [message(r) for r in entry["syntax_errors"]],
+            "logic_issues": [message(r) for r in entry["logic_issues"]],
+            "suggestions": [strings[i] for i in entry["suggestions"]],
+        }
+        suggestions.extend(expanded["suggestions"])
+        files.append(expanded)
+
+    skip = ("format", "strings", "files", "suggestions_overall", "suggestions_by_language")
+    report = {key: value for key, value in compact.items() if key not in skip}
+    report.update({"files": files, "suggestions_overall": suggestions})
+    return report
+
+
+def encode_report(report: Dict[str, Any], encoding: str = "json") -> Tuple[bytes, str, str]:
+    """
+    Serialize a report as (body, mimetype, content-encoding or None).
+    json is written without key sorting or whitespace; gzip is that JSON with
+    Content-Encoding: gzip; msgpack needs the optional msgpack package.
+    """
+    if encoding == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise ValueError("MessagePack output needs the msgpack package (pip install msgpack)")
+        return msgpack.packb(report, use_bin_type=True), "application/msgpack", None
+
+    body = json.dumps(report, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6), "application/json", "gzip"
+    if encoding == "json":
+        return body, "application/json", None
+    raise ValueError(f"Unsupported report encoding: {encoding} (expected one of {', '.join(ENCODINGS)})")
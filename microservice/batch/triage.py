@@ -0,0 +1,198 @@
+import fnmatch
+import os
+import posixpath
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Directories whose contents are third-party or build output, never student code
+VENDORED_DIRS = {
+    "node_modules", "bower_components", "jspm_packages", "vendor", "third_party", "thirdparty",
+    "site-packages", "venv", ".venv", "__pycache__", ".git", ".tox",
+    "dist", "build", "target", ".next", ".nuxt", "coverage",
+}
+
+DEFAULT_IGNORE_GLOBS = [
+    "*.min.js", "*-min.js", "*.bundle.js", "*.chunk.js", "*.packed.js",
+    "*_pb2.py", "*_pb2_grpc.py", "*.pb.c", "*.pb.cpp",
+    "*.generated.*", "*.g.cpp", "*.g.c", "*_parser.c", "*_lexer.c", "lex.yy.c", "y.tab.c",
+]
+EXTRA_IGNORE_GLOBS = [g.strip() for g in os.environ.get("BATCH_IGNORE_GLOBS", "").split(",") if g.strip()]
+
+# Banners code generators put at the top of their output. Only the leading
+# comment block is searched, and loose phrases ("do not edit", "auto-generated
+# method stub") must appear together with generator wording, so hand-written
+# files that merely mention them are still analyzed.
+GENERATED_BANNERS = [re.compile(p, re.IGNORECASE | re.DOTALL) for p in (
+    r"@generated\b",
+    r"code generated .* do not edit",
+    r"generated by the protocol buffer compiler",
+    r"a bison parser, made by gnu bison",
+    r"a lexical scanner generated by flex",
+    r"generated by (?:antlr|swig|cython|jflex|javacc|pyuic\d*)\b",
+    r"autogenerated by thrift",
+    r"(?:auto-?generated|automatically generated|generated (?:file|code)|file (?:is|was) generated)"
+    r".*do not (?:edit|modify)",
+)]
+_COMMENT_STARTS = ("#", "//", "/*", "*", "--", ";", "<!--")
+_DIRECTIVE = re.compile(r"#\s*(?:include|define|undef|if|ifdef|ifndef|pragma|import)\b")
+HEADER_BYTES = 1024
+
+MINIFIED_AVG_LINE = int(os.environ.get("TRIAGE_MINIFIED_AVG_LINE", "200"))
+MINIFIED_MAX_LINE = int(os.environ.get("TRIAGE_MINIFIED_MAX_LINE", "5000"))
+OVERSIZED_BYTES = int(os.environ.get("TRIAGE_OVERSIZED_BYTES", str(256 * 1024)))
+OVERSIZED_LINES = int(os.environ.get("TRIAGE_OVERSIZED_LINES", "10000"))
+MAX_GITIGNORE_BYTES = 64 * 1024
+
+
+def _gitignore_regex(pattern: str) -> Optional[re.Pattern]:
+    """Compile one .gitignore pattern (relative to its directory); None for blanks and comments."""
+    if not pattern or pattern.startswith("#"):
+        return None
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    body = "".join(parts)
+    prefix = "" if anchored else "(?:.*/)?"
+    # Matching a directory also matches everything below it
+    suffix = "/.*" if dir_only else "(?:/.*)?"
+    return re.compile(f"^{prefix}{body}{suffix}$")
+
+
+def leading_comments(text: str) -> str:
+    """The comment block a file starts with (blank lines included), up to its first code line."""
+    block, in_block = [], False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not (in_block or not stripped or (stripped.startswith(_COMMENT_STARTS) and not _DIRECTIVE.match(stripped))):
+            break
+        block.append(stripped)
+        if in_block or stripped.startswith("/*"):
+            rest = stripped if in_block else stripped[2:]
+            in_block = "*/" not in rest
+            if not in_block and rest.split("*/", 1)[1].strip():
+                break  # code follows the comment on the same line
+    return "\n".join(block)
+
+
+class Triage:
+    """
+    Decides which archive members are worth analyzing. Path rules (vendored
+    directories, ignore globs, .gitignore) run before a member is read; content
+    heuristics (generated headers, minified or oversized code) run on its text.
+    Each rejection returns a {"path", "reason", "category"} record for the
+    report's "skipped" section.
+    """
+
+    def __init__(self, ignore_globs: Iterable[str] = (), defaults: bool = True,
+                 gitignore: bool = True, heuristics: bool = True):
+        self.globs = list(ignore_globs) + (DEFAULT_IGNORE_GLOBS + EXTRA_IGNORE_GLOBS if defaults else [])
+        self.vendored = VENDORED_DIRS if defaults else set()
+        self.use_gitignore = gitignore
+        self.heuristics = heuristics
+        self._gitignores: Dict[str, List] = {}  # directory -> [(regex, negated, pattern)]
+
+    # ----------------------------
+    # .gitignore
+    # ----------------------------
+    @staticmethod
+    def is_gitignore(path: str) -> bool:
+        return posixpath.basename(path) == ".gitignore"
+
+    def add_gitignore(self, path: str, text: str) -> None:
+        """Register the rules of a .gitignore found at `path` inside the archive."""
+        if not self.use_gitignore:
+            return
+        rules = []
+        for line in text.splitlines():
+            line = line.strip()
+            negated = line.startswith("!")
+            regex = _gitignore_regex(line[1:] if negated else line)
+            if regex is not None:
+                rules.append((regex, negated, line))
+        if rules:
+            self._gitignores[posixpath.dirname(path)] = rules
+
+    def _gitignored(self, path: str) -> Optional[str]:
+        matched = None
+        # Outer .gitignore files first, so deeper ones can override them
+        for directory in sorted(self._gitignores, key=len):
+            if directory and not path.startswith(directory + "/"):
+                continue
+            relative = path[len(directory) + 1:] if directory else path
+            for regex, negated, line in self._gitignores[directory]:
+                if regex.match(relative):
+                    matched = None if negated else posixpath.join(directory, ".gitignore") + f": {line}"
+        return matched
+
+    # ----------------------------
+    # Checks
+    # ----------------------------
+    def check_path(self, path: str) -> Optional[Dict[str, str]]:
+        """Skip record if the path alone rules the file out, else None."""
+        for part in path.split("/")[:-1]:
+            if part in self.vendored:
+                return {"path": path, "reason": f"vendored directory '{part}'", "category": "vendored"}
+
+        name = posixpath.basename(path)
+        for glob in self.globs:
+            if fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(path, glob):
+                return {"path": path, "reason": f"matches ignore pattern '{glob}'", "category": "ignored"}
+
+        rule = self._gitignored(path)
+        if rule:
+            return {"path": path, "reason": f"ignored by {rule}", "category": "gitignore"}
+        return None
+
+    def check_content(self, path: str, code: str) -> Optional[Dict[str, str]]:
+        """Skip record if the file looks generated, minified or too large to be worth analyzing."""
+        if not self.heuristics:
+            return None
+
+        header = leading_comments(code[:HEADER_BYTES])
+        for banner in GENERATED_BANNERS:
+            match = banner.search(header)
+            if match:
+                marker = " ".join(match.group().split())
+                return {"path": path, "reason": f"generated file (header contains '{marker}')", "category": "generated"}
+
+        size = len(code)
+        lines = code.splitlines() or [""]
+        if size > OVERSIZED_BYTES or len(lines) > OVERSIZED_LINES:
+            return {"path": path, "reason": f"oversized ({size} bytes, {len(lines)} lines)", "category": "oversized"}
+
+        average = size / len(lines)
+        longest = max(len(line) for line in lines)
+        if average > MINIFIED_AVG_LINE or longest > MINIFIED_MAX_LINE:
+            return {
+                "path": path,
+                "reason": f"minified (average line {average:.0f} chars, longest {longest})",
+                "category": "minified",
+            }
+        return None
+
+
+def build_triage(ignore: Iterable[str] = (), enabled: bool = True) -> Triage:
+    """Triage from request options: extra ignore globs always apply; enabled=False turns off the built-in rules."""
+    if isinstance(ignore, str):
+        ignore = [g.strip() for g in ignore.split(",") if g.strip()]
+    return Triage(ignore, defaults=enabled, gitignore=enabled, heuristics=enabled)
@@ -0,0 +1,132 @@
+import ast
+import hashlib
+from collections import Counter
+from typing import Any, Callable, Iterable, Optional
+
+from pyjsparser import PyJsParser
+
+# Subtrees smaller than this (single leaves such as a bare name or literal)
+# are shared by almost every program and only add noise.
+MIN_SUBTREE_SIZE = 2
+
+
+def subtree_hashes(root: Any, children: Callable[[Any], Iterable[Any]],
+                   label: Callable[[Any], str], min_size: int = MIN_SUBTREE_SIZE) -> Counter:
+    """
+    Merkle-style hashing: every node's hash covers its normalized label and the
+    hashes of its children, computed bottom-up in one iterative post-order walk.
+    Returns the multiset of hashes of all subtrees with at least min_size nodes.
+    Identifier names and literal values are left out of the labels, so renamed
+    copies produce the same hashes. Runs in time linear in the tree size.
+    """
+    counts = Counter()
+    # Stack entries: (node, child results or None if not expanded yet)
+    stack = [(root, None)]
+    results = [[]]  # per-frame list of (digest, size) from finished children
+
+    while stack:
+        node, kids = stack[-1]
+        if kids is None:
+            kids = list(children(node))
+            stack[-1] = (node, kids)
+            results.append([])
+            for child in reversed(kids):
+                stack.append((child, None))
+            continue
+
+        stack.pop()
+        finished = results.pop()
+        digest = hashlib.blake2b(label(node).encode(), digest_size=8)
+        size = 1
+        for child_digest, child_size in finished:
+            digest.update(child_digest)
+            size += child_size
+        value = digest.digest()
+        if size >= min_size:
+            counts[value] += 1
+        results[-1].append((value, size))
+
+    return counts
+
+
+def multiset_similarity(a: Counter, b: Counter) -> float:
+    """Dice coefficient of two hash multisets, in percent."""
+    total = sum(a.values()) + sum(b.values())
+    if not total:
+        return 0.0
+    shared = sum((a & b).values())
+    return round(2 * shared / total * 100, 2)
+
+
+# ----------------------------
+# Python front end (ast)
+# ----------------------------
+def _python_children(node):
+    return [c for c in ast.iter_child_nodes(node) if not isinstance(c, ast.expr_context)]
+
+
+def _python_label(node):
+    if isinstance(node, ast.Constant):
+        return f"Constant:{type(node.value).__name__}"
+    return type(node).__name__
+
+
+def python_subtree_hashes(code: str) -> Counter:
+    return subtree_hashes(ast.parse(code), _python_children, _python_label)
+
+
+# ----------------------------
+# JavaScript front end (pyjsparser, as in javascript_analyzer)
+# ----------------------------
+def _js_children(node):
+    kids = []
+    for key, value in node.items():
+        if key == "loc":
+            continue
+        if isinstance(value, dict) and "type" in value:
+            kids.append(value)
+        elif isinstance(value, list):
+            kids.extend(v for v in value if isinstance(v, dict) and "type" in v)
+    return kids
+
+
+def _js_label(node):
+    op = node.get("operator")
+    return f"{node['type']}:{op}" if op else node["type"]
+
+
+def javascript_subtree_hashes(code: str) -> Counter:
+    return subtree_hashes(PyJsParser().parse(code), _js_children, _js_label)
+
+
+# ----------------------------
+# C / C++ front end (libclang, as in c_cpp_analyzer)
+# ----------------------------
+def c_cpp_subtree_hashes(code: str, language: str) -> Counter:
+    # Imported here so libclang is only loaded (with the library path
+    # configured by the analyzer module) when C/C++ is actually compared.
+    from analysis.c_cpp_analyzer import cindex
+
+    filename = "snippet.c" if language == "c" else "snippet.cpp"
+    tu = cindex.Index.create().parse(filename, unsaved_files=[(filename, code)])
+
+    def children(cursor):
+        kids = cursor.get_children()
+        if cursor.kind == cindex.CursorKind.TRANSLATION_UNIT:
+            # Skip declarations pulled in from headers
+            return [c for c in kids if c.location.file and c.location.file.name == filename]
+        return kids
+
+    return subtree_hashes(tu.cursor, children, lambda cursor: cursor.kind.name)
+
+
+def structural_hashes(code: str, language: str) -> Optional[Counter]:
+    """Subtree-hash multiset for a supported language, None otherwise."""
+    language = language.lower()
+    if language == "python":
+        return python_subtree_hashes(code)
+    if language == "javascript":
+        return javascript_subtree_hashes(code)
+    if language in ["c", "cpp", "c++"]:
+        return c_cpp_subtree_hashes(code, "c" if language == "c" else "cpp")
+    return None
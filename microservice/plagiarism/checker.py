@@ -1,14 +1,35 @@
-import ast
+import math
 import re
+import time
+from collections import Counter
 from difflib import SequenceMatcher
 from typing import List, Dict, Any, Tuple
 
+from plagiarism.ast_hash import multiset_similarity, structural_hashes
+from plagiarism.lexer import lex
+from plagiarism.levenshtein import levenshtein_ratio
+from plagiarism.tiling import DEFAULT_MIN_MATCH, matched_regions
 
-def levenshtein_similarity(s1: str, s2: str) -> float:
+
+# Verdict boundaries on the weighted final score
+PLAGIARISM_THRESHOLD = 80
+MODERATE_THRESHOLD = 60
+
+# Weights of the individual scores in the final score
+SCORE_WEIGHTS = {"levenshtein": 0.3, "token": 0.3, "statement": 0.2, "ast": 0.2}
+
+# Languages with a structural (subtree-hash) front end
+AST_LANGUAGES = ["python", "javascript", "c", "cpp", "c++"]
+
+
+def levenshtein_similarity(s1: str, s2: str, score_cutoff: float = 0.0) -> float:
+    """
+    Edit-distance similarity in percent. Pairs below score_cutoff return 0.0
+    and stop as soon as that is certain.
+    """
     if not s1 or not s2:
         return 0.0
-    seq = SequenceMatcher(None, s1, s2)
-    return round(seq.ratio() * 100, 2)
+    return levenshtein_ratio(s1, s2, score_cutoff)
 
 
 def tokenize_code(code: str) -> List[str]:
@@ -26,11 +47,10 @@ def jaccard_token_similarity(code1: str, code2: str) -> Tuple[float, List[str],
     return similarity, sorted(list(intersection)), len(union), len(intersection)
 
 
-def ast_similarity_python(code1: str, code2: str) -> float:
+def ast_similarity(code1: str, code2: str, language: str) -> float:
+    """Structural similarity from multisets of normalized subtree hashes."""
     try:
-        tree1 = ast.dump(ast.parse(code1))
-        tree2 = ast.dump(ast.parse(code2))
-        return levenshtein_similarity(tree1, tree2)
+        return multiset_similarity(structural_hashes(code1, language), structural_hashes(code2, language))
     except Exception:
         return 0.0
 
@@ -42,51 +62,159 @@ def statement_edit_distance(code1: str, code2: str) -> float:
     return round(seq.ratio() * 100, 2)
 
 
-def normalize_code_pair(code1: str, code2: str) -> Tuple[str, str, Dict[str, str], Dict[str, str]]:
+def _normalize_into(code: str, language: str, placeholder_map: Dict[str, str],
+                    reverse_map: Dict[str, str]) -> str:
+    """
+    Rewrite one document in a single lexer pass: comments are dropped (their
+    newlines kept), strings become STRING, and every identifier is replaced
+    by its placeholder, allocating new ones in order of first appearance.
+    """
+    out = []
+    for tok in lex(code, language):
+        if tok.kind == "comment":
+            out.append("\n" * tok.text.count("\n"))
+        elif tok.kind in ("ident", "string"):
+            ident = tok.text if tok.kind == "ident" else "STRING"
+            placeholder = reverse_map.get(ident)
+            if placeholder is None:
+                placeholder = f"VAR{len(reverse_map) + 1}"
+                placeholder_map[placeholder] = ident
+                reverse_map[ident] = placeholder
+            out.append(placeholder)
+        else:
+            out.append(tok.text)
+    return "".join(out)
+
+
+def normalize_code_pair(code1: str, code2: str, language: str = None) -> Tuple[str, str, Dict[str, str], Dict[str, str]]:
     """
     Normalize two codes with a shared placeholder mapping to avoid mismatches.
     Returns (norm_code1, norm_code2, placeholder->identifier, identifier->placeholder).
     """
-    def clean_code(code):
-        code = re.sub(r"#.*", "", code)  # remove comments
-        code = re.sub(r'".*?"|\'.*?\'', "STRING", code)  # replace strings
-        return code
+    placeholder_map = {}
+    reverse_map = {}
+    norm1 = _normalize_into(code1, language, placeholder_map, reverse_map)
+    norm2 = _normalize_into(code2, language, placeholder_map, reverse_map)
+    return norm1, norm2, placeholder_map, reverse_map
 
-    code1, code2 = clean_code(code1), clean_code(code2)
 
-    # combined identifiers preserving order of first appearance
-    identifiers = []
-    for ident in re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', code1 + "\n" + code2):
-        if ident not in identifiers:
-            identifiers.append(ident)
+def normalize_code(code: str, language: str = None) -> str:
+    """Normalize a single document with its own placeholder numbering."""
+    return _normalize_into(code, language, {}, {})
 
-    placeholder_map = {}
-    reverse_map = {}
-    norm1, norm2 = code1, code2
 
-    for i, ident in enumerate(identifiers, start=1):
-        placeholder = f"VAR{i}"
-        placeholder_map[placeholder] = ident
-        reverse_map[ident] = placeholder
-        norm1 = re.sub(rf"\b{ident}\b", placeholder, norm1)
-        norm2 = re.sub(rf"\b{ident}\b", placeholder, norm2)
+def length_ratio_bound(s1: str, s2: str) -> float:
+    """Upper bound on levenshtein_similarity: the distance is at least the length difference."""
+    if not s1 or not s2:
+        return 0.0
+    return _ceil2(min(len(s1), len(s2)) / max(len(s1), len(s2)) * 100)
 
-    return norm1, norm2, placeholder_map, reverse_map
 
+def line_overlap_bound(code1: str, code2: str) -> float:
+    """
+    Upper bound on statement_edit_distance from hashed line multisets: the
+    matcher can never pair up more lines than the two files have in common.
+    """
+    stmts1 = Counter(line.strip() for line in code1.splitlines() if line.strip())
+    stmts2 = Counter(line.strip() for line in code2.splitlines() if line.strip())
+    total = sum(stmts1.values()) + sum(stmts2.values())
+    if not total:
+        return 100.0
+    return _ceil2(2 * sum((stmts1 & stmts2).values()) / total * 100)
 
-def perform_plagiarism_check(code1: str, code2: str, language: str) -> Dict[str, Any]:
+
+def _ceil2(value: float) -> float:
+    return math.ceil(value * 100) / 100
+
+
+def verdict_for(score: float) -> str:
+    if score > PLAGIARISM_THRESHOLD:
+        return "⚠️ Potential Plagiarism"
+    if score > MODERATE_THRESHOLD:
+        return "⚠️ Moderate Similarity"
+    return "✅ No significant plagiarism"
+
+
+def perform_plagiarism_check(code1: str, code2: str, language: str,
+                             min_match_length: int = DEFAULT_MIN_MATCH,
+                             full_scoring: bool = False) -> Dict[str, Any]:
+    """
+    Cascaded check: cheap scores and upper bounds run first, and each expensive
+    scorer only runs while the weighted score range still spans a verdict
+    boundary. full_scoring=True computes every score (e.g. for audits).
+    """
+    if min_match_length < 1:
+        raise ValueError(f"min_match_length must be at least 1, got {min_match_length}")
     language = language.lower()
+    stages = []
+
+    def run(stage, fn, *args):
+        start = time.perf_counter()
+        value = fn(*args)
+        stages.append({"stage": stage, "ran": True, "ms": round((time.perf_counter() - start) * 1000, 3)})
+        return value
+
+    def skip(stage):
+        stages.append({"stage": stage, "ran": False, "ms": 0.0})
 
     # Normalized comparison (shared)
-    norm_code1, norm_code2, placeholder_map, reverse_map = normalize_code_pair(code1, code2)
+    norm_code1, norm_code2, placeholder_map, reverse_map = run("normalize", normalize_code_pair, code1, code2, language)
+
+    # --- Cheap stages: exact token score + bounds for the rest ---
+    token_sim, common_tokens, total_tokens, common_count = run("token", jaccard_token_similarity, norm_code1, norm_code2)
+    ast_supported = language in AST_LANGUAGES
+
+    scores = {"token": token_sim}
+    bounds = {
+        "levenshtein": run("length", length_ratio_bound, norm_code1, norm_code2),
+        "statement": run("lines", line_overlap_bound, code1, code2),
+        "ast": 100.0,
+    }
+    if not ast_supported:
+        scores["ast"] = 0.0
+
+    def score_range():
+        lower = sum(SCORE_WEIGHTS[name] * value for name, value in scores.items())
+        upper = lower + sum(SCORE_WEIGHTS[name] * value for name, value in bounds.items() if name not in scores)
+        return lower, upper
+
+    def decided():
+        lower, upper = score_range()
+        return not full_scoring and verdict_for(lower) == verdict_for(upper)
 
-    levenshtein = levenshtein_similarity(norm_code1, norm_code2)
-    token_sim, common_tokens, total_tokens, common_count = jaccard_token_similarity(norm_code1, norm_code2)
-    stmt_sim = statement_edit_distance(code1, code2)
+    # --- Expensive stages, cheapest first ---
+    if decided():
+        skip("statement")
+    else:
+        scores["statement"] = run("statement", statement_edit_distance, code1, code2)
 
-    ast_sim = 0.0
-    if language == "python":
-        ast_sim = ast_similarity_python(code1, code2)
+    if ast_supported:
+        if decided():
+            skip("ast")
+        else:
+            scores["ast"] = run("ast", ast_similarity, code1, code2, language)
+
+    lev_cutoff = 0.0
+    if decided():
+        skip("levenshtein")
+    else:
+        # Levenshtein only has to be exact if it can lift the pair over the
+        # next verdict boundary; below that cutoff it may stop early.
+        if not full_scoring:
+            lower, _ = score_range()
+            boundary = next(b for b in (MODERATE_THRESHOLD, PLAGIARISM_THRESHOLD, math.inf) if b >= lower)
+            if boundary != math.inf:
+                lev_cutoff = max(0.0, (boundary - lower) / SCORE_WEIGHTS["levenshtein"])
+        levenshtein = run("levenshtein", levenshtein_similarity, norm_code1, norm_code2, lev_cutoff)
+        if lev_cutoff and levenshtein < lev_cutoff:
+            bounds["levenshtein"] = min(bounds["levenshtein"], _ceil2(lev_cutoff))
+        else:
+            scores["levenshtein"] = levenshtein
+
+    lower, upper = score_range()
+    exact = len(scores) == len(SCORE_WEIGHTS)
+    final_score = round(lower, 2)
+    verdict = verdict_for(final_score)
 
     # Identifier matches: resolve placeholders back to original names
     matches = []
@@ -97,24 +225,31 @@ def perform_plagiarism_check(code1: str, code2: str, language: str) -> Dict[str,
         else:
             matches.append(f"{tok} → {tok}")
 
-    # Weighted final score
-    final_score = round((levenshtein * 0.3) + (token_sim * 0.3) + (stmt_sim * 0.2) + (ast_sim * 0.2), 2)
-
-    if final_score > 80:
-        verdict = "⚠️ Potential Plagiarism"
-    elif final_score > 60:
-        verdict = "⚠️ Moderate Similarity"
+    # Copied blocks as line spans in both files (only worth it for flagged pairs)
+    regions = []
+    if full_scoring or final_score > MODERATE_THRESHOLD:
+        regions = run("tiling", matched_regions, code1, code2, language, min_match_length)
     else:
-        verdict = "✅ No significant plagiarism"
+        skip("tiling")
+
+    def fmt(name):
+        if name in scores:
+            return f"{scores[name]:.2f}%"
+        if name == "levenshtein" and lev_cutoff:
+            return f"< {min(lev_cutoff, 100):.2f}%"
+        return f"≤ {bounds[name]:.2f}%"
 
     return {
-        "levenshteinSimilarity": f"{levenshtein:.2f}%",
-        "tokenSimilarity": f"{token_sim:.2f}%",
-        "statementSimilarity": f"{stmt_sim:.2f}%",
-        "astSimilarity": f"{ast_sim:.2f}%" if language == "python" else "N/A",
+        "levenshteinSimilarity": fmt("levenshtein"),
+        "tokenSimilarity": fmt("token"),
+        "statementSimilarity": fmt("statement"),
+        "astSimilarity": fmt("ast") if ast_supported else "N/A",
         "commonTokensCount": common_count,
         "totalUniqueTokens": total_tokens,
         "identifierMatches": matches,
-        "finalScore": f"{final_score:.2f}%",
-        "verdict": verdict
+        "matchedRegions": regions,
+        "finalScore": f"{final_score:.2f}%" if exact else f"{lower:.2f}–{upper:.2f}%",
+        "verdict": verdict,
+        "stages": stages,
+        "fullScoring": full_scoring
     }
@@ -0,0 +1,163 @@
+import heapq
+from typing import Any, Dict, Hashable, List, Set, Union
+
+from plagiarism.checker import perform_plagiarism_check
+from plagiarism.fingerprint import (
+    DEFAULT_K,
+    DEFAULT_MAX_DOC_FREQUENCY,
+    DEFAULT_WINDOW,
+    build_fingerprint_index,
+    count_shared_fingerprints,
+    fingerprint_tokens,
+)
+from plagiarism.minhash import (
+    DEFAULT_BANDS,
+    DEFAULT_ROWS,
+    estimated_jaccard,
+    lsh_candidate_pairs,
+    lsh_recall,
+    minhash_signature,
+    shingle_hashes,
+)
+from plagiarism.tokens import token_stream
+
+Submissions = Union[Dict[Hashable, str], List[Dict[str, Any]]]
+
+
+def submission_items(submissions: Submissions) -> Dict[Hashable, str]:
+    """
+    Accept either {id: code} or [{"id": ..., "code": ...}, ...] and return {id: code}.
+    Entries without an id are numbered by position.
+    """
+    if isinstance(submissions, dict):
+        return dict(submissions)
+
+    items = {}
+    for i, sub in enumerate(submissions):
+        sub_id = sub.get("id", i)
+        if sub_id in items:
+            raise ValueError(f"Duplicate submission id: {sub_id}")
+        items[sub_id] = sub.get("code", "")
+    return items
+
+
+def fingerprint_corpus(codes: Dict[Hashable, str], language: str,
+                       k: int = DEFAULT_K, window: int = DEFAULT_WINDOW) -> Dict[Hashable, Set[int]]:
+    """
+    Tokenize and winnow every submission exactly once. The stream keeps
+    operators, punctuation and literal kinds: keywords and "ID" alone are too
+    uniform, and unrelated programs would share most of their fingerprints.
+    """
+    return {
+        sub_id: fingerprint_tokens(token_stream(code, language)[0], k, window)
+        for sub_id, code in codes.items()
+    }
+
+
+def rank_similar_pairs(fingerprints: Dict[Hashable, Set[int]], top_n: int = 20,
+                       max_doc_frequency: int = DEFAULT_MAX_DOC_FREQUENCY) -> List[Dict[str, Any]]:
+    """
+    Score every pair that shares at least one fingerprint and return the top N.
+    Similarity is the Jaccard index of the two fingerprint sets; coverage is the
+    share of each submission's fingerprints found in the other.
+    """
+    index = build_fingerprint_index(fingerprints)
+    shared = count_shared_fingerprints(index, max_doc_frequency)
+
+    def score(item):
+        (a, b), count = item
+        union = len(fingerprints[a]) + len(fingerprints[b]) - count
+        return count / union if union else 0.0
+
+    best = heapq.nlargest(top_n, shared.items(), key=lambda item: (score(item), item[1]))
+
+    pairs = []
+    for (a, b), count in best:
+        pairs.append({
+            "first": a,
+            "second": b,
+            "shared": count,
+            "similarity": round(score(((a, b), count)) * 100, 2),
+            "first_coverage": round(count / len(fingerprints[a]) * 100, 2),
+            "second_coverage": round(count / len(fingerprints[b]) * 100, 2),
+        })
+    return pairs
+
+
+def perform_corpus_check(submissions: Submissions, language: str, top_n: int = 20,
+                         k: int = DEFAULT_K, window: int = DEFAULT_WINDOW,
+                         max_doc_frequency: int = DEFAULT_MAX_DOC_FREQUENCY) -> Dict[str, Any]:
+    language = language.lower()
+    codes = submission_items(submissions)
+    fingerprints = fingerprint_corpus(codes, language, k, window)
+    pairs = rank_similar_pairs(fingerprints, top_n, max_doc_frequency)
+
+    return {
+        "submissions": len(codes),
+        "language": language,
+        "fingerprintsIndexed": sum(len(fps) for fps in fingerprints.values()),
+        "maxDocFrequency": max_doc_frequency,
+        "topPairs": [
+            {
+                "first": p["first"],
+                "second": p["second"],
+                "sharedFingerprints": p["shared"],
+                "similarity": f"{p['similarity']:.2f}%",
+                "firstCoverage": f"{p['first_coverage']:.2f}%",
+                "secondCoverage": f"{p['second_coverage']:.2f}%",
+            }
+            for p in pairs
+        ],
+    }
+
+
+def perform_screened_check(submissions: Submissions, language: str, threshold: float = 0.4,
+                           bands: int = DEFAULT_BANDS, rows: int = DEFAULT_ROWS,
+                           top_n: int = 50) -> Dict[str, Any]:
+    """
+    MinHash/LSH screening: only pairs that collide in an LSH band and whose
+    estimated Jaccard reaches `threshold` get the full weighted pairwise check.
+    Shingles come from token_stream rather than the VARn normalization, whose
+    placeholders shift when a line is added above and break every shingle.
+    Submissions without a single token (empty or comment-only) cannot be
+    screened; they are listed under emptySubmissions instead.
+    """
+    if bands < 1 or rows < 1:
+        raise ValueError("bands and rows must be at least 1")
+    language = language.lower()
+    codes = submission_items(submissions)
+    signatures = {
+        sub_id: minhash_signature(shingle_hashes(token_stream(code, language)[0]), bands * rows)
+        for sub_id, code in codes.items()
+    }
+
+    candidates = lsh_candidate_pairs(signatures, bands, rows)
+    survivors = []
+    for a, b in candidates:
+        estimate = estimated_jaccard(signatures[a], signatures[b])
+        if estimate >= threshold:
+            survivors.append((estimate, a, b))
+    survivors.sort(key=lambda item: item[0], reverse=True)
+
+    pairs = []
+    for estimate, a, b in survivors[:top_n]:
+        result = perform_plagiarism_check(codes[a], codes[b], language)
+        pairs.append({"first": a, "second": b, "estimatedJaccard": f"{estimate * 100:.2f}%", **result})
+
+    total_pairs = len(codes) * (len(codes) - 1) // 2
+    return {
+        "submissions": len(codes),
+        "language": language,
+        "bands": bands,
+        "rows": rows,
+        "threshold": threshold,
+        "totalPairs": total_pairs,
+        "candidatePairs": len(candidates),
+        "scoredPairs": len(pairs),
+        # Pruned by the screen, vs. above the threshold but beyond top_n
+        "prunedPairs": total_pairs - len(survivors),
+        "truncatedPairs": len(survivors) - len(pairs),
+        "emptySubmissions": [sub_id for sub_id, sig in signatures.items() if not sig],
+        "estimatedRecall": f"{lsh_recall(threshold, bands, rows) * 100:.2f}%",
+        "pairs": pairs,
+    }
@@ -0,0 +1,105 @@
+import hashlib
+import os
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Hashable, List, Set, Tuple
+
+# Rolling-hash parameters. Hashes are kept below 2**61 so they fit a signed
+# 64-bit integer column if they are ever persisted.
+_MODULUS = (1 << 61) - 1
+_BASE = 1_000_003
+
+DEFAULT_K = 5
+DEFAULT_WINDOW = 4
+# Fingerprints found in more documents than this are boilerplate (starter
+# code, common idioms) and are not counted. Like MOSS's -m option, it also
+# bounds the work per fingerprint, so corpus cost grows with fingerprints
+# rather than with pairs.
+DEFAULT_MAX_DOC_FREQUENCY = int(os.environ.get("PLAGIARISM_MAX_DOC_FREQUENCY", "10"))
+
+
+def token_hash(token: str) -> int:
+    """Stable (process-independent) 60-bit hash of a single token."""
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big") >> 4
+
+
+def kgram_hashes(tokens: List[str], k: int = DEFAULT_K) -> List[int]:
+    """Karp-Rabin rolling hashes of every k consecutive tokens."""
+    if len(tokens) < k:
+        return []
+
+    cache: Dict[str, int] = {}
+    values = []
+    for tok in tokens:
+        value = cache.get(tok)
+        if value is None:
+            value = cache[tok] = token_hash(tok)
+        values.append(value)
+
+    top = pow(_BASE, k - 1, _MODULUS)
+    h = 0
+    for value in values[:k]:
+        h = (h * _BASE + value) % _MODULUS
+    hashes = [h]
+    for i in range(k, len(values)):
+        h = ((h - values[i - k] * top) * _BASE + values[i]) % _MODULUS
+        hashes.append(h)
+    return hashes
+
+
+def winnow(hashes: List[int], window: int = DEFAULT_WINDOW) -> List[Tuple[int, int]]:
+    """
+    Winnowing (Schleimer et al.): keep the minimum hash of every window,
+    rightmost on ties, recording each selection once.
+    Returns (hash, k-gram position) pairs.
+    """
+    if not hashes:
+        return []
+    if len(hashes) <= window:
+        pos = min(range(len(hashes)), key=lambda i: (hashes[i], -i))
+        return [(hashes[pos], pos)]
+
+    selected = []
+    last = -1
+    for start in range(len(hashes) - window + 1):
+        pos = start
+        for i in range(start + 1, start + window):
+            if hashes[i] <= hashes[pos]:
+                pos = i
+        if pos != last:
+            selected.append((hashes[pos], pos))
+            last = pos
+    return selected
+
+
+def fingerprint_tokens(tokens: List[str], k: int = DEFAULT_K, window: int = DEFAULT_WINDOW) -> Set[int]:
+    """Set of winnowed fingerprints for a token stream."""
+    return {h for h, _ in winnow(kgram_hashes(tokens, k), window)}
+
+
+def build_fingerprint_index(fingerprints: Dict[Hashable, Set[int]]) -> Dict[int, List[Hashable]]:
+    """Inverted index: fingerprint -> documents that contain it."""
+    index = defaultdict(list)
+    for doc_id, fps in fingerprints.items():
+        for h in fps:
+            index[h].append(doc_id)
+    return index
+
+
+def count_shared_fingerprints(index: Dict[int, List[Hashable]],
+                              max_doc_frequency: int = DEFAULT_MAX_DOC_FREQUENCY) -> Dict[Tuple[Hashable, Hashable], int]:
+    """
+    Count shared fingerprints per document pair by walking the posting lists.
+    Only pairs that actually share something are ever touched. Fingerprints
+    present in more than `max_doc_frequency` documents (boilerplate shared by
+    the whole class) are ignored; 0 disables the limit.
+    """
+    shared = defaultdict(int)
+    for postings in index.values():
+        if len(postings) < 2:
+            continue
+        if max_doc_frequency and len(postings) > max_doc_frequency:
+            continue
+        for a, b in combinations(postings, 2):
+            shared[(a, b)] += 1
+    return shared
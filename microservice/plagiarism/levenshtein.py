@@ -0,0 +1,96 @@
+from typing import Hashable, Optional, Sequence
+
+# How many text columns to process between two diagonal lower-bound checks.
+# Each check costs about as much as one column, so checking every column
+# would nearly double the work on pairs that never get cut off.
+_CHECK_INTERVAL = 8
+
+
+def levenshtein_distance(s1: Sequence[Hashable], s2: Sequence[Hashable],
+                         max_distance: Optional[int] = None) -> int:
+    """
+    Exact Levenshtein distance using the Myers/Hyyro bit-vector algorithm.
+
+    Works on strings or on any sequence of hashable items (e.g. token IDs).
+    Python ints act as arbitrarily wide bit vectors, so one text column costs a
+    handful of big-int operations instead of a full DP column.
+
+    With max_distance, returns max_distance + 1 as soon as the result is
+    provably larger: first from the length difference, then from the running
+    value on the diagonal that ends in the bottom-right cell (values never
+    decrease along a diagonal).
+    """
+    # Longer sequence is the bit-vector pattern; we iterate over the shorter one.
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    m, n = len(s1), len(s2)
+
+    if max_distance is not None and m - n > max_distance:
+        return max_distance + 1
+    if n == 0:
+        return m
+
+    peq = {}
+    bit = 1
+    for ch in s1:
+        peq[ch] = peq.get(ch, 0) | bit
+        bit <<= 1
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn = full, 0
+    score = m
+    offset = m - n  # row on the final diagonal for text column 0
+
+    for j, ch in enumerate(s2, start=1):
+        eq = peq.get(ch, 0)
+        xv = eq | vn
+        xh = (((eq & vp) + vp) ^ vp) | eq
+        hp = (vn | ~(xh | vp)) & full
+        hn = vp & xh
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(xv | hp)) & full
+        vn = hp & xv
+
+        if max_distance is not None:
+            # D[m][n] >= D[m][j] - (n - j): the last row gains at most one per column.
+            if score - (n - j) > max_distance:
+                return max_distance + 1
+            if j % _CHECK_INTERVAL == 0:
+                low = (1 << (j + offset)) - 1
+                diagonal = j + (vp & low).bit_count() - (vn & low).bit_count()
+                if diagonal > max_distance:
+                    return max_distance + 1
+
+    if max_distance is not None and score > max_distance:
+        return max_distance + 1
+    return score
+
+
+def levenshtein_ratio(s1: Sequence[Hashable], s2: Sequence[Hashable],
+                      score_cutoff: float = 0.0) -> float:
+    """
+    Normalized edit similarity in percent: (1 - distance / max(len)) * 100.
+    Returns 0.0 when the similarity is below score_cutoff, without finishing
+    the distance computation once that is certain.
+    """
+    longest = max(len(s1), len(s2))
+    if longest == 0:
+        return 100.0
+    if score_cutoff > 100:
+        return 0.0
+
+    max_distance = None
+    if score_cutoff > 0:
+        max_distance = int(longest * (1 - score_cutoff / 100) + 1e-9)
+    distance = levenshtein_distance(s1, s2, max_distance)
+    if max_distance is not None and distance > max_distance:
+        return 0.0
+
+    similarity = round((1 - distance / longest) * 100, 2)
+    return similarity if similarity >= score_cutoff else 0.0
@@ -0,0 +1,75 @@
+import re
+from typing import Iterator, NamedTuple, Optional
+
+# Building blocks shared by the language profiles below.
+_DQ_STRING = r'"(?:\\.|[^"\\\n])*"'
+_SQ_STRING = r"'(?:\\.|[^'\\\n])*'"
+_LINE_COMMENT = r"//[^\n]*"
+_BLOCK_COMMENT = r"/\*[\s\S]*?\*/"
+
+
+def _profile(comment: str, string: str) -> "re.Pattern":
+    return re.compile(
+        rf"(?P<comment>{comment})"
+        rf"|(?P<string>{string})"
+        r"|(?P<word>\w+)"
+        # A whitespace run stops after its last newline, so indentation starts
+        # its own match and line-anchored patterns (C directives) can claim it
+        r"|(?P<space>\s*\n|\s+)"
+        r"|(?P<other>.)",
+        re.MULTILINE,
+    )
+
+
+LANGUAGE_PATTERNS = {
+    "python": _profile(
+        r"\#[^\n]*",
+        rf'"""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|{_DQ_STRING}|{_SQ_STRING}',
+    ),
+    "javascript": _profile(
+        rf"{_LINE_COMMENT}|{_BLOCK_COMMENT}",
+        rf"{_DQ_STRING}|{_SQ_STRING}|`(?:\\.|[^`\\])*`",
+    ),
+    "java": _profile(
+        rf"{_LINE_COMMENT}|{_BLOCK_COMMENT}",
+        rf'"""[\s\S]*?"""|{_DQ_STRING}|{_SQ_STRING}',
+    ),
+    # Preprocessor lines carry no authorship signal and are dropped like comments.
+    "c": _profile(
+        rf"{_LINE_COMMENT}|{_BLOCK_COMMENT}|^[ \t]*\#[^\n]*",
+        rf"{_DQ_STRING}|{_SQ_STRING}",
+    ),
+    # Used when the language is unknown: '#' comments and quoted strings.
+    "default": _profile(r"\#[^\n]*", r'".*?"|\'.*?\''),
+}
+LANGUAGE_PATTERNS["cpp"] = LANGUAGE_PATTERNS["c"]
+LANGUAGE_PATTERNS["c++"] = LANGUAGE_PATTERNS["c"]
+
+_IDENTIFIER = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+
+
+class Token(NamedTuple):
+    kind: str   # "ident", "number", "string", "comment", "space" or "other"
+    text: str
+    line: int   # 1-based line the token starts on
+
+
+def lex(code: str, language: Optional[str] = None) -> Iterator[Token]:
+    """
+    Split source into tokens in a single left-to-right scan. Concatenating the
+    text of every token reproduces the input exactly.
+    """
+    pattern = LANGUAGE_PATTERNS.get((language or "").lower(), LANGUAGE_PATTERNS["default"])
+    line = 1
+    for match in pattern.finditer(code):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == "word":
+            # Same rule as the old \b[a-zA-Z_][a-zA-Z0-9_]*\b scan: ASCII words
+            # starting with a letter or underscore are identifiers.
+            if _IDENTIFIER.fullmatch(text):
+                kind = "ident"
+            else:
+                kind = "number" if text[0].isdigit() else "other"
+        yield Token(kind, text, line)
+        line += text.count("\n")
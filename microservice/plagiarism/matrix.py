@@ -0,0 +1,101 @@
+from typing import Any, Dict, Hashable, List
+
+import numpy as np
+from scipy import sparse
+
+from plagiarism.corpus import Submissions, submission_items
+from plagiarism.tokens import token_stream
+
+DEFAULT_CHUNK_SIZE = 256
+# Columns are n-grams of token_stream tokens: the same n-gram means the same
+# code shape in every file, and short sequences carry more than single tokens
+NGRAM_SIZE = 3
+
+
+def token_count_matrix(codes: Dict[Hashable, str], language: str) -> sparse.csr_matrix:
+    """Sparse (submissions x vocabulary) matrix of token n-gram counts."""
+    vocabulary = {}
+    indptr, indices, data = [0], [], []
+    for code in codes.values():
+        counts = {}
+        tokens = token_stream(code, language)[0]
+        for i in range(max(len(tokens) - NGRAM_SIZE + 1, 1 if tokens else 0)):
+            col = vocabulary.setdefault(" ".join(tokens[i:i + NGRAM_SIZE]), len(vocabulary))
+            counts[col] = counts.get(col, 0) + 1
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    return sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(codes), max(len(vocabulary), 1)),
+    )
+
+
+def _prepare(counts: sparse.csr_matrix, metric: str):
+    if metric == "cosine":
+        norms = np.sqrt(counts.multiply(counts).sum(axis=1)).A1
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ counts, None
+    if metric == "jaccard":
+        binary = (counts > 0).astype(np.float32).tocsr()
+        return binary, binary.sum(axis=1).A1
+    raise ValueError(f"Unsupported metric: {metric}")
+
+
+def iter_similarity_chunks(counts: sparse.csr_matrix, metric: str = "cosine",
+                           chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Yield (first row, dense similarity block) for `chunk_size` rows at a time,
+    so peak memory is chunk_size x n instead of n x n.
+    Cosine uses L2-normalized counts; Jaccard uses the token sets:
+    |A & B| = (B B^T)_ij and |A | B| = |A| + |B| - |A & B|.
+    """
+    matrix, sizes = _prepare(counts, metric)
+    transposed = matrix.T.tocsc()
+    for start in range(0, matrix.shape[0], chunk_size):
+        block = (matrix[start:start + chunk_size] @ transposed).toarray()
+        if metric == "jaccard":
+            union = sizes[start:start + chunk_size, None] + sizes[None, :] - block
+            block = np.divide(block, union, out=np.zeros_like(block), where=union > 0)
+        yield start, block
+
+
+def similarity_matrix(submissions: Submissions, language: str, metric: str = "cosine",
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Full n x n similarity matrix (percent), for heatmaps of small cohorts."""
+    codes = submission_items(submissions)
+    counts = token_count_matrix(codes, language.lower())
+    result = np.zeros((len(codes), len(codes)), dtype=np.float32)
+    for start, block in iter_similarity_chunks(counts, metric, chunk_size):
+        result[start:start + block.shape[0]] = block
+    return {
+        "ids": list(codes),
+        "metric": metric,
+        "matrix": np.round(result.astype(np.float64) * 100, 2).tolist(),
+    }
+
+
+def top_k_neighbors(submissions: Submissions, language: str, k: int = 5, metric: str = "cosine",
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """The k most similar other submissions for every submission."""
+    codes = submission_items(submissions)
+    ids = list(codes)
+    counts = token_count_matrix(codes, language.lower())
+    k = max(0, min(k, len(ids) - 1))
+
+    neighbors: List[Dict[str, Any]] = [None] * len(ids)
+    for start, block in iter_similarity_chunks(counts, metric, chunk_size):
+        rows = np.arange(block.shape[0])
+        block[rows, start + rows] = -1.0  # exclude self-similarity
+        if k == 0:
+            for row in rows:
+                neighbors[start + row] = {"id": ids[start + row], "neighbors": []}
+            continue
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        for row in rows:
+            cols = sorted(top[row], key=lambda c: -block[row, c])
+            neighbors[start + row] = {
+                "id": ids[start + row],
+                "neighbors": [{"id": ids[c], "similarity": f"{block[row, c] * 100:.2f}%"} for c in cols],
+            }
+    return {"metric": metric, "k": k, "neighbors": neighbors}
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Hashable, List, Set, Tuple
+
+from plagiarism.fingerprint import token_hash
+
+# Over token_stream (punctuation included), 4-grams are common idioms; six
+# tokens keep unrelated programs well below the default screening threshold
+DEFAULT_SHINGLE_SIZE = 6
+DEFAULT_BANDS = 50
+DEFAULT_ROWS = 3
+
+_HASH_BITS = 60
+_EMPTY = None
+
+
+def shingle_hashes(tokens: List[str], size: int = DEFAULT_SHINGLE_SIZE) -> Set[int]:
+    """Hashes of every `size` consecutive tokens (the whole stream if shorter)."""
+    if not tokens:
+        return set()
+    if len(tokens) < size:
+        return {token_hash(" ".join(tokens))}
+    return {token_hash(" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+def minhash_signature(hashes: Set[int], num_perm: int) -> List[int]:
+    """
+    One-permutation MinHash: the hash range is split into num_perm bins and
+    each slot keeps the minimum hash that fell into its bin, so a signature
+    costs one pass over the shingles instead of num_perm passes.
+    Empty bins are filled by rotation (Shrivastava & Li, 2014) from the next
+    non-empty bin, offset by the distance so borrowed values stay distinct.
+    An empty shingle set gets an empty signature, which matches nothing.
+    """
+    sig = [_EMPTY] * num_perm
+    for h in hashes:
+        slot = h % num_perm
+        value = h >> 8
+        if sig[slot] is _EMPTY or value < sig[slot]:
+            sig[slot] = value
+
+    if all(v is _EMPTY for v in sig):
+        return []
+
+    step = 1 << _HASH_BITS
+    dense = list(sig)
+    for i in range(num_perm):
+        if sig[i] is not _EMPTY:
+            continue
+        distance = 1
+        while sig[(i + distance) % num_perm] is _EMPTY:
+            distance += 1
+        dense[i] = sig[(i + distance) % num_perm] + distance * step
+    return dense
+
+
+def estimated_jaccard(sig1: List[int], sig2: List[int]) -> float:
+    """Fraction of equal slots: an unbiased estimate of the shingle-set Jaccard index."""
+    if not sig1:
+        return 0.0
+    return sum(1 for a, b in zip(sig1, sig2) if a == b) / len(sig1)
+
+
+def lsh_candidate_pairs(signatures: Dict[Hashable, List[int]], bands: int,
+                        rows: int) -> Set[Tuple[Hashable, Hashable]]:
+    """
+    LSH banding: signatures are cut into `bands` bands of `rows` slots and two
+    submissions become a candidate pair if any band hashes to the same bucket.
+    Empty signatures (no shingles) are left out.
+    """
+    if bands < 1 or rows < 1:
+        raise ValueError("bands and rows must be at least 1")
+    signatures = {doc_id: sig for doc_id, sig in signatures.items() if sig}
+    order = {doc_id: i for i, doc_id in enumerate(signatures)}
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        lo, hi = band * rows, (band + 1) * rows
+        for doc_id, sig in signatures.items():
+            buckets[tuple(sig[lo:hi])].append(doc_id)
+        for members in buckets.values():
+            for a, b in combinations(members, 2):
+                candidates.add((a, b) if order[a] < order[b] else (b, a))
+    return candidates
+
+
+def lsh_recall(jaccard: float, bands: int, rows: int) -> float:
+    """Probability that a pair with the given Jaccard index becomes a candidate."""
+    return 1 - (1 - jaccard ** rows) ** bands
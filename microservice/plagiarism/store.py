@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from plagiarism.fingerprint import fingerprint_tokens
+from plagiarism.minhash import DEFAULT_BANDS, DEFAULT_ROWS, estimated_jaccard, minhash_signature, shingle_hashes
+from plagiarism.tokens import token_stream
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "PLAGIARISM_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fingerprints.db"),
+)
+SIGNATURE_SIZE = DEFAULT_BANDS * DEFAULT_ROWS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT NOT NULL UNIQUE,
+    language TEXT NOT NULL,
+    term TEXT,
+    fingerprint_count INTEGER NOT NULL,
+    signature TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    hash INTEGER NOT NULL,
+    submission_id INTEGER NOT NULL,
+    PRIMARY KEY (hash, submission_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fingerprints_submission ON fingerprints (submission_id);
+CREATE INDEX IF NOT EXISTS idx_submissions_language ON submissions (language);
+"""
+
+
+def submission_features(code: str, language: str):
+    """Winnowed fingerprints and MinHash signature, computed once per submission."""
+    tokens = token_stream(code, language)[0]
+    fingerprints = fingerprint_tokens(tokens)
+    shingles = shingle_hashes(tokens)
+    return fingerprints, minhash_signature(shingles, SIGNATURE_SIZE)
+
+
+class FingerprintStore:
+    """
+    SQLite archive of submission fingerprints for cross-term lookups.
+    The (hash, submission_id) primary key doubles as the inverted index, so a
+    lookup touches only the postings of the query's own fingerprints.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ----------------------------
+    # Insert / delete
+    # ----------------------------
+    def add(self, label: str, code: str, language: str, term: Optional[str] = None) -> int:
+        return self.add_many([{"id": label, "code": code, "language": language, "term": term}])[0]
+
+    def add_many(self, submissions: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Insert submissions in one transaction. An existing label is replaced,
+        so re-archiving a corrected submission is an incremental update.
+        """
+        ids = []
+        with self._connect() as conn:
+            for sub in submissions:
+                label, code = str(sub["id"]), sub.get("code", "")
+                language = sub.get("language", "").lower()
+                fingerprints, signature = submission_features(code, language)
+
+                self._delete(conn, label)
+                cur = conn.execute(
+                    "INSERT INTO submissions (label, language, term, fingerprint_count, signature, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (label, language, sub.get("term"), len(fingerprints), json.dumps(signature),
+                     datetime.utcnow().isoformat() + "Z"),
+                )
+                conn.executemany(
+                    "INSERT INTO fingerprints (hash, submission_id) VALUES (?, ?)",
+                    ((h, cur.lastrowid) for h in fingerprints),
+                )
+                ids.append(cur.lastrowid)
+        return ids
+
+    def remove(self, label: str) -> bool:
+        with self._connect() as conn:
+            return self._delete(conn, label)
+
+    @staticmethod
+    def _delete(conn, label: str) -> bool:
+        row = conn.execute("SELECT id FROM submissions WHERE label = ?", (label,)).fetchone()
+        if not row:
+            return False
+        conn.execute("DELETE FROM fingerprints WHERE submission_id = ?", (row[0],))
+        conn.execute("DELETE FROM submissions WHERE id = ?", (row[0],))
+        return True
+
+    # ----------------------------
+    # Lookup
+    # ----------------------------
+    def lookup(self, code: str, language: str, top_n: int = 10, min_shared: int = 1) -> List[Dict[str, Any]]:
+        """
+        Archived submissions most similar to `code`, ranked by the Jaccard
+        index of the fingerprint sets (then by shared count), so a large
+        archived file does not outrank a close copy just by sharing more.
+        """
+        language = language.lower()
+        fingerprints, signature = submission_features(code, language)
+        if not fingerprints:
+            return []
+
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_hashes (hash INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM query_hashes")
+            conn.executemany("INSERT INTO query_hashes (hash) VALUES (?)", ((h,) for h in fingerprints))
+            rows = conn.execute(
+                """
+                SELECT s.label, s.term, s.fingerprint_count, s.signature, COUNT(*) AS shared
+                FROM query_hashes q
+                JOIN fingerprints f ON f.hash = q.hash
+                JOIN submissions s ON s.id = f.submission_id
+                WHERE s.language = ?
+                GROUP BY f.submission_id
+                HAVING shared >= ?
+                ORDER BY CAST(shared AS REAL) / (? + s.fingerprint_count - shared) DESC, shared DESC
+                LIMIT ?
+                """,
+                (language, min_shared, len(fingerprints), top_n),
+            ).fetchall()
+
+        matches = []
+        for label, term, count, stored_signature, shared in rows:
+            union = len(fingerprints) + count - shared
+            matches.append({
+                "id": label,
+                "term": term,
+                "sharedFingerprints": shared,
+                "similarity": f"{shared / union * 100 if union else 0.0:.2f}%",
+                "coverage": f"{shared / len(fingerprints) * 100:.2f}%",
+                "estimatedJaccard": f"{estimated_jaccard(signature, json.loads(stored_signature)) * 100:.2f}%",
+            })
+        return matches
+
+    # ----------------------------
+    # Maintenance
+    # ----------------------------
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            submissions = conn.execute("SELECT COUNT(*) FROM submissions").fetchone()[0]
+            fingerprints = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        return {"submissions": submissions, "fingerprints": fingerprints}
+
+    def compact(self) -> Dict[str, int]:
+        """Drop orphaned postings, refresh planner statistics and reclaim free pages."""
+        with self._connect() as conn:
+            orphans = conn.execute(
+                "DELETE FROM fingerprints WHERE submission_id NOT IN (SELECT id FROM submissions)"
+            ).rowcount
+            conn.execute("ANALYZE")
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        return {"orphansRemoved": orphans, **self.stats()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the plagiarism fingerprint archive.")
+    parser.add_argument("command", choices=["compact", "stats"])
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="path to the archive database")
+    args = parser.parse_args(argv)
+
+    store = FingerprintStore(args.db)
+    result = store.compact() if args.command == "compact" else store.stats()
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from plagiarism.fingerprint import kgram_hashes
+from plagiarism.tokens import token_stream
+
+DEFAULT_MIN_MATCH = 8
+INITIAL_SEARCH_LENGTH = 20
+# Windows of b occurring more often than this are repetitive boilerplate
+# (generated tables, unrolled statements); matching them is quadratic and
+# says nothing about copying, so they are never tiled.
+MAX_BUCKET_SIZE = 64
+
+
+def _free_runs(marked: bytearray) -> List[int]:
+    """runs[i] = number of consecutive unmarked tokens starting at i."""
+    runs = [0] * (len(marked) + 1)
+    for i in range(len(marked) - 1, -1, -1):
+        runs[i] = 0 if marked[i] else runs[i + 1] + 1
+    return runs
+
+
+def _scan_pattern(a: List[str], b: List[str], marked_a: bytearray, marked_b: bytearray,
+                  length: int) -> List[Tuple[int, int, int]]:
+    """
+    Maximal matches of at least `length` unmarked tokens, found through a
+    Karp-Rabin hash table over the unmarked windows of b.
+    Returns (match length, start in a, start in b) triples.
+    """
+    free_a, free_b = _free_runs(marked_a), _free_runs(marked_b)
+    hashes_a, hashes_b = kgram_hashes(a, length), kgram_hashes(b, length)
+
+    # Each bucket is split by the token before the window (None at a marked
+    # or start-of-stream boundary). A match is left-maximal unless both
+    # windows follow the same unmarked token, so for each start in a the
+    # sub-bucket keyed by its own previous token is skipped without a walk.
+    table: Dict[int, Dict[Optional[str], List[int]]] = defaultdict(lambda: defaultdict(list))
+    sizes = defaultdict(int)
+    for j, h in enumerate(hashes_b):
+        if free_b[j] >= length:
+            table[h][b[j - 1] if j and not marked_b[j - 1] else None].append(j)
+            sizes[h] += 1
+    for h, size in sizes.items():
+        if size > MAX_BUCKET_SIZE:
+            del table[h]
+
+    matches = []
+    for i, h in enumerate(hashes_a):
+        if free_a[i] < length or h not in table:
+            continue
+        previous = a[i - 1] if i and not marked_a[i - 1] else None
+        for before, starts in table[h].items():
+            if previous is not None and before == previous:
+                continue  # the tail of a match found one position earlier
+            for j in starts:
+                if a[i:i + length] != b[j:j + length]:
+                    continue  # hash collision
+                k = length
+                limit = min(free_a[i], free_b[j])
+                while k < limit and a[i + k] == b[j + k]:
+                    k += 1
+                matches.append((k, i, j))
+    return matches
+
+
+def greedy_string_tiling(a: List[str], b: List[str], min_match: int = DEFAULT_MIN_MATCH,
+                         initial_search: int = INITIAL_SEARCH_LENGTH) -> List[Tuple[int, int, int]]:
+    """
+    Running-Karp-Rabin Greedy String Tiling (Wise, 1993), as used by JPlag.
+    Longest common runs are turned into non-overlapping tiles first; the search
+    length then halves down to min_match. A larger min_match drops short,
+    often coincidental tiles and ends the search sooner.
+    Returns (start in a, start in b, length) tiles.
+    """
+    if min_match < 1:
+        raise ValueError(f"min_match must be at least 1, got {min_match}")
+    marked_a, marked_b = bytearray(len(a)), bytearray(len(b))
+    tiles = []
+    search = max(initial_search, min_match)
+
+    while True:
+        matches = _scan_pattern(a, b, marked_a, marked_b, search)
+        longest = max((m[0] for m in matches), default=0)
+        if longest > 2 * search:
+            # Much longer matches exist: rescan at that length so they are
+            # tiled before the shorter ones found at this length.
+            search = longest
+            continue
+
+        for k, i, j in sorted(matches, reverse=True):
+            if any(marked_a[i:i + k]) or any(marked_b[j:j + k]):
+                continue  # occluded by a longer tile
+            marked_a[i:i + k] = b"\x01" * k
+            marked_b[j:j + k] = b"\x01" * k
+            tiles.append((i, j, k))
+
+        if search > 2 * min_match:
+            search //= 2
+        elif search > min_match:
+            search = min_match
+        else:
+            break
+
+    return sorted(tiles)
+
+
+def matched_regions(code1: str, code2: str, language: str,
+                    min_match: int = DEFAULT_MIN_MATCH) -> List[Dict[str, Any]]:
+    """Tiles over the normalized token streams, reported as line spans in both files."""
+    tokens1, lines1 = token_stream(code1, language)
+    tokens2, lines2 = token_stream(code2, language)
+
+    regions = []
+    for i, j, k in greedy_string_tiling(tokens1, tokens2, min_match):
+        regions.append({
+            "firstLines": [lines1[i], lines1[i + k - 1]],
+            "secondLines": [lines2[j], lines2[j + k - 1]],
+            "tokens": k,
+        })
+    return regions
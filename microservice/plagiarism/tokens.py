@@ -0,0 +1,75 @@
+import keyword
+from typing import List, Tuple
+
+from plagiarism.lexer import lex
+
+# Reserved words per language. Everything else that looks like an identifier
+# is collapsed to a single "ID" token so renaming variables does not hide a copy.
+KEYWORDS = {
+    "python": set(keyword.kwlist) | {"print", "range", "len", "self"},
+    "javascript": {
+        "break", "case", "catch", "class", "const", "continue", "debugger", "default",
+        "delete", "do", "else", "export", "extends", "false", "finally", "for", "function",
+        "if", "import", "in", "instanceof", "let", "new", "null", "return", "super",
+        "switch", "this", "throw", "true", "try", "typeof", "undefined", "var", "void",
+        "while", "with", "yield", "async", "await", "of", "console"
+    },
+    "java": {
+        "abstract", "assert", "boolean", "break", "byte", "case", "catch", "char", "class",
+        "const", "continue", "default", "do", "double", "else", "enum", "extends", "final",
+        "finally", "float", "for", "if", "implements", "import", "instanceof", "int",
+        "interface", "long", "native", "new", "null", "package", "private", "protected",
+        "public", "return", "short", "static", "super", "switch", "synchronized", "this",
+        "throw", "throws", "try", "void", "volatile", "while", "true", "false", "String",
+        "System", "var"
+    },
+    "c": {
+        "auto", "break", "case", "char", "const", "continue", "default", "do", "double",
+        "else", "enum", "extern", "float", "for", "goto", "if", "int", "long", "register",
+        "return", "short", "signed", "sizeof", "static", "struct", "switch", "typedef",
+        "union", "unsigned", "void", "volatile", "while", "printf", "scanf", "NULL"
+    },
+}
+KEYWORDS["cpp"] = KEYWORDS["c"] | {
+    "bool", "catch", "class", "delete", "false", "friend", "inline", "namespace", "new",
+    "nullptr", "operator", "private", "protected", "public", "template", "this", "throw",
+    "true", "try", "using", "virtual", "std", "cout", "cin", "endl", "string", "vector"
+}
+KEYWORDS["c++"] = KEYWORDS["cpp"]
+
+
+def structural_tokens(code: str, language: str) -> List[str]:
+    """
+    Token stream used for fingerprinting: keywords are kept verbatim and every
+    other identifier becomes "ID", so the stream survives variable renaming.
+    """
+    reserved = KEYWORDS.get(language.lower(), set())
+    tokens = []
+    for tok in lex(code, language):
+        if tok.kind == "ident":
+            tokens.append(tok.text if tok.text in reserved else "ID")
+        elif tok.kind == "string":
+            tokens.append("STRING")
+    return tokens
+
+
+def token_stream(code: str, language: str) -> Tuple[List[str], List[int]]:
+    """
+    Finer-grained stream for tiling: like structural_tokens but also keeping
+    numbers (as NUM) and punctuation, with the source line of every token.
+    """
+    reserved = KEYWORDS.get(language.lower(), set())
+    tokens, lines = [], []
+    for tok in lex(code, language):
+        if tok.kind == "ident":
+            tokens.append(tok.text if tok.text in reserved else "ID")
+        elif tok.kind == "string":
+            tokens.append("STRING")
+        elif tok.kind == "number":
+            tokens.append("NUM")
+        elif tok.kind == "other":
+            tokens.append(tok.text)
+        else:
+            continue
+        lines.append(tok.line)
+    return tokens, lines
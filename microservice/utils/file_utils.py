@@ -2,7 +2,6 @@ import os
 import zipfile
 import tempfile
 import shutil
-import requests
 
 # Supported extensions → language mapping
 SUPPORTED_EXTENSIONS = {
@@ -44,32 +43,6 @@ def extract_zip(zip_path, extract_to=None):
     return extract_to
 
 
-def download_github_repo(repo_url, extract_to=None):
-    """
-    Downloads a GitHub repo as zip and extracts it.
-    Supports URLs like: https://github.com/user/repo
-    Returns extracted folder path.
-    """
-    if repo_url.endswith("/"):
-        repo_url = repo_url[:-1]
-    zip_url = repo_url + "/archive/refs/heads/main.zip"
-
-    if extract_to is None:
-        extract_to = tempfile.mkdtemp(prefix="batch_repo_")
-
-    zip_path = os.path.join(extract_to, "repo.zip")
-
-    response = requests.get(zip_url, stream=True)
-    if response.status_code != 200:
-        raise Exception(f"Failed to download repo: {response.status_code}")
-
-    with open(zip_path, "wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-
-    return extract_zip(zip_path, extract_to)
-
-
 def list_code_files(base_path):
     """
     Recursively collects supported code files from a directory.
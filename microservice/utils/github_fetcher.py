@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Base URLs are configurable so the fetcher can run against a local stand-in
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_WEB_URL = os.environ.get("GITHUB_WEB_URL", "https://github.com")
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN") or None
+DEFAULT_CACHE_DIR = os.environ.get(
+    "GITHUB_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "github"),
+)
+MAX_ARCHIVE_BYTES = int(os.environ.get("GITHUB_MAX_ARCHIVE_BYTES", str(500 * 1024 * 1024)))
+# Total size of cached archives; least recently used ones are evicted past it (0 = unbounded)
+MAX_CACHE_BYTES = int(os.environ.get("GITHUB_CACHE_BYTES", str(4 * 1024 * 1024 * 1024)))
+CHUNK_SIZE = 256 * 1024
+TIMEOUT = (5, 30)  # connect, read
+
+
+class FetchError(Exception):
+    """The repository archive could not be downloaded."""
+
+
+def parse_repo_url(repo_url):
+    """(owner, repo) from https://github.com/owner/repo[.git][/...] or a bare owner/repo."""
+    path = urlparse(repo_url.strip()).path if "://" in repo_url else repo_url.strip()
+    parts = [p for p in path.split("/") if p]
+    if len(parts) < 2:
+        raise FetchError(f"Not a GitHub repository URL: {repo_url}")
+    owner, repo = parts[0], parts[1]
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    return owner, repo
+
+
+def _session(token):
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "ai-code-review-assistant"
+    if token:
+        session.headers["Authorization"] = f"Bearer {token}"
+    return session
+
+
+class GitHubFetcher:
+    """
+    Downloads repository zipballs over one pooled session into a local cache
+    keyed by repo + ref. Cached archives are revalidated with If-None-Match,
+    so an unchanged repo costs a 304 instead of a download. The default branch
+    comes from the repos API (also ETag-revalidated), with main / master as a
+    fallback when the API is unavailable or rate limited. Archives beyond
+    max_cache_bytes are evicted, least recently used first.
+    """
+
+    def __init__(self, api_url=GITHUB_API_URL, web_url=GITHUB_WEB_URL, cache_dir=DEFAULT_CACHE_DIR,
+                 token=GITHUB_TOKEN, max_bytes=MAX_ARCHIVE_BYTES, session=None,
+                 max_cache_bytes=MAX_CACHE_BYTES):
+        self.api_url = api_url.rstrip("/")
+        self.web_url = web_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self.session = session or _session(token)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ----------------------------
+    # Cache files
+    # ----------------------------
+    def _cache_path(self, *parts):
+        name = hashlib.sha256("/".join(parts).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, name)
+
+    @staticmethod
+    def _read_meta(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(path, meta):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _evict(self, keep):
+        """Delete least recently used archives (and their metadata) until the cache fits."""
+        if self.max_cache_bytes <= 0:
+            return
+        archives = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".zip") and entry.path != keep:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # evicted by another process meanwhile
+                archives.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in archives) + os.path.getsize(keep)
+        # Jobs hard-link the archive they run on, so deleting the cache entry is safe
+        for _, size, path in sorted(archives):
+            if total <= self.max_cache_bytes:
+                break
+            for victim in (path, path + ".json"):
+                try:
+                    os.unlink(victim)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    # ----------------------------
+    # Default branch
+    # ----------------------------
+    def default_branch(self, owner, repo):
+        """Default branch from the repos API, or None if the API gave no answer."""
+        meta_path = self._cache_path("repo", owner, repo) + ".json"
+        meta = self._read_meta(meta_path)
+        headers = {"Accept": "application/vnd.github+json"}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        try:
+            r = self.session.get(f"{self.api_url}/repos/{owner}/{repo}", headers=headers, timeout=TIMEOUT)
+        except requests.RequestException:
+            return meta.get("default_branch")
+        if r.status_code == 304:
+            return meta.get("default_branch")
+        if r.status_code == 404:
+            raise FetchError(f"Repository not found: {owner}/{repo}")
+        if r.status_code != 200:
+            return meta.get("default_branch")
+        branch = r.json().get("default_branch")
+        self._write_meta(meta_path, {"etag": r.headers.get("ETag"), "default_branch": branch})
+        return branch
+
+    # ----------------------------
+    # Archives
+    # ----------------------------
+    def _download(self, owner, repo, ref):
+        """Path of the cached zipball for ref, or None if the ref does not exist."""
+        archive_path = self._cache_path("archive", owner, repo, ref) + ".zip"
+        meta_path = archive_path + ".json"
+        meta = self._read_meta(meta_path)
+
+        headers = {}
+        if meta.get("etag") and os.path.exists(archive_path):
+            headers["If-None-Match"] = meta["etag"]
+
+        url = f"{self.web_url}/{owner}/{repo}/archive/refs/heads/{ref}.zip"
+        try:
+            with self.session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+                if r.status_code == 304:
+                    os.utime(archive_path)  # mtime is the last use, for eviction
+                    return archive_path
+                if r.status_code == 404:
+                    return None
+                if r.status_code != 200:
+                    raise FetchError(f"Failed to fetch {owner}/{repo}@{ref}: HTTP {r.status_code}")
+
+                # Stream to a temp file; replacing atomically keeps concurrent readers safe
+                fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+                try:
+                    size = 0
+                    with os.fdopen(fd, "wb") as f:
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                raise FetchError(f"Repository archive exceeds {self.max_bytes} bytes")
+                            f.write(chunk)
+                    os.replace(tmp, archive_path)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+                self._write_meta(meta_path, {"etag": r.headers.get("ETag"), "ref": ref})
+                self._evict(keep=archive_path)
+                return archive_path
+        except requests.RequestException as e:
+            if os.path.exists(archive_path):
+                return archive_path  # offline: serve the last good copy
+            raise FetchError(f"Failed to fetch {owner}/{repo}@{ref}: {e}")
+
+    def fetch(self, repo_url, ref=None):
+        """Local path of the repo's zipball (default branch unless ref is given)."""
+        owner, repo = parse_repo_url(repo_url)
+        refs = [ref] if ref else []
+        if not refs:
+            branch = self.default_branch(owner, repo)
+            refs = [branch] if branch else ["main", "master"]
+
+        for candidate in refs:
+            path = self._download(owner, repo, candidate)
+            if path:
+                return path
+        raise FetchError(f"Failed to fetch GitHub repo {owner}/{repo} ({', '.join(refs)})")
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # A forked job worker must not share the parent's pooled sockets
+    global _default_fetcher, _default_lock
+    _default_fetcher = None
+    _default_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def fetch_repo_archive(repo_url, ref=None):
+    """fetch() on a process-wide fetcher, so every caller shares one connection pool and cache."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = GitHubFetcher()
+        fetcher = _default_fetcher
+    return fetcher.fetch(repo_url, ref)